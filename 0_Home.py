@@ -1,7 +1,5 @@
-from st_supabase_connection import SupabaseConnection
 import streamlit as st
-import pandas as pd
-from utils import calculate_win_probability, probability_to_odds, get_live_games, get_game_by_id
+from startup import mark_first_paint
 from datetime import datetime
 
 st.set_page_config(
@@ -13,43 +11,33 @@ st.set_page_config(
     }
 )
 
+# App Title, drawn before any network call
+st.title("Basketboule")
+st.sidebar.subheader("Big Bets bring Big Bucks 🤑")
+st.subheader("NBA Betting Simulator")
+mark_first_paint("Home")
+
+# Imported after the title is drawn: pandas and the nba_api endpoints take a while to load
+import pandas as pd
+from utils import get_past_games
+from live import get_live_odds
+from ledger import BetLedger, SupabaseBackend
+from bet_queue import BetRejected, get_bet_queue
+import metrics
+
 # Initialize Supabase connection
-supabase = st.connection("supabase", type=SupabaseConnection)
+def get_supabase():
+    # Imported lazily: the Supabase client is only needed to log in and to bet
+    from st_supabase_connection import SupabaseConnection
+    return st.connection("supabase", type=SupabaseConnection)
 
 # Fetch today's NBA games
 
 # @st.cache_data(ttl=3600)  # Cache data for 1 hour
 def format_games():
-    
-    # Load ELO ratings
-    elo_df = pd.read_csv('elo-2023-24.csv')
-    elo_dict = dict(zip(elo_df['Team'], elo_df['Elo']))
-    
-    last_games = get_live_games()
-    
-    games = []
-    for _, game in last_games.iterrows():
-        home_team = game['homeTeamName']
-        away_team = game['awayTeamName']
-        
-        home_elo = elo_dict.get(home_team, 1500)  # Default ELO if not found
-        away_elo = elo_dict.get(away_team, 1500)  # Default ELO if not found
-        
-        home_win_prob = round(calculate_win_probability(home_elo, away_elo), 2)
-        away_win_prob = round(1 - home_win_prob, 2)
-        game_info = {
-            'Game ID': game['gameId'],
-            'Home Team': game['homeTeamName'],
-            'Away Team': game['awayTeamName'],
-            'Home Team ID': str(game['homeTeamId']),
-            'Away Team ID': str(game['awayTeamId']),
-            'Home Odds': probability_to_odds(home_win_prob),
-            'Away Odds': probability_to_odds(away_win_prob),
-            'Status': game['gameStatusText']
-        }
-        games.append(game_info)
-    
-    return pd.DataFrame(games)
+    # Odds of the shared scoreboard snapshot, repriced in the background on every
+    # poll from the Elo ratings and, for games in progress, their score and clock
+    return get_live_odds()
 
 # Initialize session state for bets
 if 'bets' not in st.session_state:
@@ -59,14 +47,11 @@ if 'bets' not in st.session_state:
 if 'user' not in st.session_state:
     st.session_state['user'] = None
 
-games = format_games()
-
-# App Title
-st.title("Basketboule")
-st.sidebar.subheader("Big Bets bring Big Bucks 🤑")
-st.subheader("NBA Betting Simulator")
-
 st.write("Games of the day")
+with st.spinner("Loading today's games..."):
+    with metrics.timer('nba_transform_seconds', step='format_games'):
+        games = format_games()
+
 if games.empty:
     st.info("There are no NBA games scheduled for today.")
 else:
@@ -115,15 +100,9 @@ else:
         ),
     }
 
-    # Prepare the dataframe with logo URLs and game links
-    display_df = games.copy()
-    display_df['Home Logo'] = display_df.apply(lambda row: f"https://cdn.nba.com/logos/nba/{row['Home Team ID']}/global/L/logo.svg", axis=1)
-    display_df['Away Logo'] = display_df.apply(lambda row: f"https://cdn.nba.com/logos/nba/{row['Away Team ID']}/global/L/logo.svg", axis=1)
-    display_df['Game Link'] = display_df.apply(lambda row: f"https://www.nba.com/game/{row['Game ID']}", axis=1)
-    
-    # Display the dataframe
+    # Display the dataframe (logo URLs and game links come with the odds table)
     st.dataframe(
-        display_df[['Home Logo', 'Away Logo', 'Home Team', 'Away Team', 'Home Odds', 'Away Odds', 'Status', 'Game Link']],
+        games[['Home Logo', 'Away Logo', 'Home Team', 'Away Team', 'Home Odds', 'Away Odds', 'Status', 'Game Link']],
         column_config=column_config,
         hide_index=True,
     )
@@ -145,7 +124,7 @@ if st.session_state['user'] is None:
 
         if st.form_submit_button('Login 🪄'):
             try:
-                response = supabase.auth.sign_in_with_password(dict(email=email, password=password))
+                response = get_supabase().auth.sign_in_with_password(dict(email=email, password=password))
                 auth_success_message = f"""Logged in. Welcome 🔓"""
                 st.session_state['user'] = response.user
 
@@ -160,6 +139,10 @@ if st.session_state['user'] is None:
                 st.error(str(e), icon="❌")
 
 else:
+    supabase = get_supabase()
+    ledger = BetLedger(SupabaseBackend(supabase))
+    bet_queue = get_bet_queue(ledger)
+
     with st.sidebar:
         st.write(f"Welcome, {st.session_state['user'].email}!")
         if st.button("Logout"):
@@ -183,17 +166,23 @@ else:
 
         stake = st.number_input("Enter your stake ($)", min_value=1.0, step=1.0)
 
-        team_choice = st.radio(
+        # Odds move with every poll: the options are the team names (so the choice survives a
+        # repricing) and the bet carries the odds shown on the previous run, the ones the user saw
+        offered = {home_team: home_odds, away_team: away_odds}
+        seen_odds = st.session_state.get('seen_odds', {})
+        st.session_state['seen_odds'] = {(game_id, team): odds for team, odds in offered.items()}
+
+        chosen_team = st.radio(
             "Choose a team to bet on:",
-            (f"{home_team} (Odds: {home_odds:.2f})", f"{away_team} (Odds: {away_odds:.2f})")
+            (home_team, away_team),
+            format_func=lambda team: f"{team} (Odds: {offered[team]:.2f})",
+            key=f"team_choice_{game_id}",
         )
 
         # Place Bet button logic
         if st.button("Place Bet"):
-            # Determine which team was chosen and get corresponding odds
-            chosen_team = team_choice.split(" (")[0]  # Get just the team name
-            chosen_odds = float(team_choice.split("Odds: ")[1].strip(")"))  # Extract odds value
-            
+            chosen_odds = float(seen_odds.get((game_id, chosen_team), offered[chosen_team]))
+
             bet = {
                 'user_id': st.session_state['user'].id,
                 'date': datetime.now().strftime('%Y-%m-%d'),
@@ -206,65 +195,41 @@ else:
                 'payout': stake * chosen_odds
             }
             
-            # Insert bet into Supabase
-            supabase.table("bets").insert(bet).execute()
-            st.success("Bet placed successfully and stored in Supabase!")
+            # Queue the bet against the latest in-play odds; it is written to Supabase in the background
+            bet_queue.update_odds(get_live_odds())
+            try:
+                bet_queue.submit(bet)
+                st.success("Bet placed successfully! It will show up in your bets shortly.")
+            except BetRejected as e:
+                st.error(str(e), icon="❌")
 
     # Display Betting History (only for the logged-in user)
     st.header("Your Bets")
 
-    # Fetch bets from Supabase for the current user
-    bets_response = supabase.table("bets").select("*").eq("user_id", st.session_state['user'].id).execute()
-    bets = bets_response.data
+    # Settle pending bets whose games are finished, then page through the history
+    user_id = st.session_state['user'].id
+    ledger.settle(user_id, get_past_games())
+    bets_df = ledger.history(user_id)
+    queued = bet_queue.pending(user_id)
+    if queued:
+        st.caption(f"{queued} bet(s) still being recorded.")
 
-    if bets:
-        bets_df = pd.DataFrame(bets)
+    if not bets_df.empty:
         bets_df['date'] = pd.to_datetime(bets_df['date']).dt.strftime('%Y-%m-%d')
-        
-        # Compute results for each bet
-        results = []
-        for _, bet in bets_df.iterrows():
-            game_result = get_game_by_id(bet['game_id'])
-            if game_result is not None and not game_result.empty:
-                game_result = game_result.iloc[0]
-                home_score = game_result['homeTeamScore']
-                away_score = game_result['awayTeamScore']
-                winner = bet['home_team'] if home_score > away_score else bet['away_team']
-                
-                if bet['chosen_team'] == winner:
-                    results.append({
-                        'result': 'Win',
-                        'payout': bet['stake'] * bet['odds']
-                    })
-                else:
-                    results.append({
-                        'result': 'Loss',
-                        'payout': 0
-                    })
-            else:
-                results.append({
-                    'result': 'Pending',
-                    'payout': 0
-                })
-        
-        # Add results to dataframe
-        results_df = pd.DataFrame(results)
-        bets_df['result'] = results_df['result']
-        bets_df['actual_payout'] = results_df['payout']
+        bets_df['result'] = bets_df['result'].fillna('Pending')
+        bets_df['actual_payout'] = bets_df['actual_payout'].fillna(0)
         
         # Display betting history
         display_cols = ['date', 'home_team', 'away_team', 'chosen_team', 'odds', 'stake', 'result', 'actual_payout']
         st.dataframe(bets_df[display_cols])
         
-        # Summarize gains for the user
-        total_stake = bets_df['stake'].sum()
-        total_payout = bets_df['actual_payout'].sum()
-        net_profit = total_payout - total_stake
+        # Summarize gains for the user from the running totals
+        summary = ledger.totals(user_id)
         
         col1, col2, col3 = st.columns(3)
-        col1.metric("Total Stake", f"${total_stake:.2f}")
-        col2.metric("Total Payout", f"${total_payout:.2f}")
-        col3.metric("Net Profit", f"${net_profit:.2f}", f"ROI: {(net_profit/total_stake*100):.1f}%")
+        col1.metric("Total Stake", f"${summary['total_stake']:.2f}")
+        col2.metric("Total Payout", f"${summary['total_payout']:.2f}")
+        col3.metric("Net Profit", f"${summary['net_profit']:.2f}", f"ROI: {summary['roi']:.1f}%")
     else:
         st.info("You haven't placed any bets yet.")
 
@@ -1,10 +1,5 @@
 import streamlit as st
-from nba_api.stats.static import teams
-from nba_api.stats.endpoints import teamdetails, teamyearbyyearstats, commonteamroster, teamgamelog
-from utils import fetch_data, fetch_player_stats
-import pandas as pd
-import plotly.express as px
-from datetime import datetime
+from startup import mark_first_paint
 
 st.set_page_config(
     page_title="NBA Teams 👥", 
@@ -14,9 +9,20 @@ st.set_page_config(
 
 def show_teams():
     st.title("NBA Teams 👥")
+    mark_first_paint("Teams")
+
+    # Imported after the title is drawn: pandas and the nba_api endpoints take a while to load
+    from nba_api.stats.endpoints import teamdetails, teamyearbyyearstats, commonteamroster
+    from utils import fetch_data, fetch_player_stats_batch, roster_table
+    from entities import get_team_index
+    from team_logs import get_team_season_log, result_styles
+    from games_dataset import FIRST_SEASON
+    from store import current_season_start
+    from assets import logo
+    import pandas as pd
     
-    all_teams = teams.get_teams()
-    team_names = [team['full_name'] for team in all_teams]
+    team_index = get_team_index()
+    team_names = team_index.names
     
     # Get the current query parameters
     params = st.query_params
@@ -24,8 +30,8 @@ def show_teams():
     # Check if there's a team_id in the query parameters
     default_team = None
     if "team_id" in params:
-        team_id = params["team_id"]
-        default_team = next((team['full_name'] for team in all_teams if str(team['id']) == team_id), None)
+        team = team_index.get(params["team_id"])
+        default_team = team['full_name'] if team else None
     
     # Use session state to store the selected team
     if 'selected_team' not in st.session_state:
@@ -35,18 +41,18 @@ def show_teams():
     selected_team = st.selectbox(
         "Select a team", 
         team_names, 
-        index=team_names.index(st.session_state.selected_team)
+        index=team_index.positions[st.session_state.selected_team]
     )
     
     # Update session state and query params if a new team is selected
     if selected_team != st.session_state.selected_team:
         st.session_state.selected_team = selected_team
-        team = next((team for team in all_teams if team['full_name'] == selected_team), None)
+        team = team_index.get(selected_team)
         st.query_params["team_id"] = str(team['id'])
         st.rerun()
     
     if selected_team:
-        team = next(team for team in all_teams if team['full_name'] == selected_team)
+        team = team_index.get(selected_team)
         team_id = team['id']
         
         team_info = fetch_data(teamdetails.TeamDetails, team_id=team_id)
@@ -59,7 +65,7 @@ def show_teams():
         with st.sidebar:
             nba_stats_url = f"https://www.nba.com/stats/team/{team_id}"
             st.markdown(f"## [{team['full_name']} ({team['abbreviation']})]({nba_stats_url})")
-            st.image(f"https://cdn.nba.com/logos/nba/{team_id}/global/L/logo.svg", width=200)
+            st.image(logo(team_id), width=200)
         
             st.subheader("Current Season Stats")
             current_season_stats = team_stats.iloc[-1]
@@ -81,24 +87,9 @@ def show_teams():
         st.write("Player statistics are averaged per game for the current season.")
         roster = fetch_data(commonteamroster.CommonTeamRoster, team_id=team_id)
         if roster is not None and not roster.empty:
-            player_data_list = []
-            for _, player in roster.iterrows():
-                player_id = player['PLAYER_ID']
-                player_stats = fetch_player_stats(player_id)
-                
-                if player_stats is not None and not player_stats.empty:
-                    current_season_stats = player_stats.iloc[-1]
-                    
-                    player_data_list.append({
-                        'Name': player['PLAYER'],
-                        'Number': player['NUM'],
-                        'Position': player['POSITION'],
-                        'Points': round(current_season_stats['PTS'] / current_season_stats['GP'], 1) if current_season_stats['GP'] > 0 else 0,
-                        'Assists': round(current_season_stats['AST'] / current_season_stats['GP'], 1) if current_season_stats['GP'] > 0 else 0,
-                        'Rebounds': round(current_season_stats['REB'] / current_season_stats['GP'], 1) if current_season_stats['GP'] > 0 else 0,
-                    })
-
-            player_data = pd.DataFrame(player_data_list)
+            # Fetch every player's career stats concurrently
+            all_player_stats = fetch_player_stats_batch(roster['PLAYER_ID'])
+            player_data = roster_table(roster, all_player_stats)
             st.dataframe(player_data, hide_index=True)
         else:
             st.write("Roster data not available")
@@ -109,66 +100,70 @@ def show_teams():
             # Historical performance chart
             st.subheader("Historical Performance")
             if 'YEAR' in team_stats.columns and 'WIN_PCT' in team_stats.columns:
+                # Plotly is only loaded when the chart is shown
+                import plotly.express as px
                 fig = px.line(team_stats, x='YEAR', y='WIN_PCT', title='Win Percentage Over Years')
                 fig.update_layout(xaxis_title='Year', yaxis_title='Win Percentage')
                 st.plotly_chart(fig)
             else:
                 st.write("Historical data not available")
 
+        # League leaders come from the precomputed snapshot (python leaderboards.py)
+        show_leaders = st.sidebar.toggle("Show League Leaders", value=False)
+
+        if show_leaders:
+            from leaderboards import load_leaderboards, leaderboard
+            st.subheader("League Leaders")
+            leaders = load_leaderboards()
+            if leaders is not None and not leaders.empty:
+                boards = list(pd.unique(leaders['board']))
+                for tab, board in zip(st.tabs(boards), boards):
+                    tab.dataframe(
+                        leaderboard(leaders, board).rename(columns=str.title).round(3),
+                        hide_index=True,
+                    )
+            else:
+                st.write("League leaders not available")
+
+        # Monte Carlo projection of the current season, shared by all sessions
+        show_odds = st.sidebar.toggle("Show Playoff Odds", value=False)
+
+        if show_odds:
+            from simulation import get_projection, N_SIMULATIONS
+            st.subheader("Playoff Odds")
+            with st.spinner(f"Simulating the rest of the season {N_SIMULATIONS:,} times..."):
+                projection = get_projection()
+            if projection is not None:
+                team_odds = projection[projection['TEAM_ID'] == team_id]
+                if not team_odds.empty:
+                    odds = team_odds.iloc[0]
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Projected Wins", f"{odds['PROJECTED_WINS']:.1f}",
+                                help=f"80% range: {odds['WINS_P10']}-{odds['WINS_P90']}")
+                    col2.metric("Playoffs", f"{odds['PLAYOFFS']:.1%}")
+                    col3.metric("Conference Title", f"{odds['CONFERENCE_TITLE']:.1%}")
+                    col4.metric("Title", f"{odds['TITLE']:.1%}")
+                    conference = projection[projection['CONFERENCE'] == odds['CONFERENCE']]
+                    st.dataframe(
+                        conference.sort_values('PROJECTED_WINS', ascending=False)
+                        .drop(columns=['TEAM_ID', 'CONFERENCE']).dropna(axis=1, how='all').round(3),
+                        hide_index=True,
+                    )
+            else:
+                st.write("Season schedule not available")
+
         def display_season_games(season):
-            game_log = fetch_data(teamgamelog.TeamGameLog, team_id=team_id, season=season)
+            # Served from the team's in-memory history, one upstream request per team
+            game_log = get_team_season_log(team_id, season)
             
-            if game_log is not None and not game_log.empty:
+            if not game_log.empty:
                 st.subheader(f"Games for the {season}-{season+1} Season")
-                # Convert GAME_DATE to datetime
-                game_log['GAME_DATE'] = pd.to_datetime(game_log['GAME_DATE'])
-                
-                # Sort games by date (most recent first)
-                game_log = game_log.sort_values('GAME_DATE', ascending=False)
+                games_display = game_log.assign(GAME_DATE=game_log['GAME_DATE'].dt.strftime('%Y-%m-%d'))[
+                    ['GAME_DATE', 'OPPONENT', 'SCORE', 'WL', 'GAME_LINK']
+                ].rename(columns={'GAME_DATE': 'Date', 'OPPONENT': 'Opponent'})
                 
-                # Prepare data for display
-                games_display = game_log[['GAME_DATE', 'MATCHUP', 'WL', 'PTS', 'Game_ID']].copy()
-                games_display['GAME_DATE'] = games_display['GAME_DATE'].dt.strftime('%Y-%m-%d')
-                
-                # Extract opponent name and score from MATCHUP
-                def extract_opponent_and_score(matchup):
-                    parts = matchup.split()
-                    opponent = parts[2] if parts[1] in ['vs.', '@'] else parts[1]
-                    score = parts[-1]
-                    return pd.Series([opponent, score])
-
-                games_display[['OPPONENT', 'OPP_SCORE']] = games_display['MATCHUP'].apply(extract_opponent_and_score)
-                
-                # Create a score column
-                games_display['SCORE'] = games_display.apply(lambda row: f"{row['PTS']} - {row['OPP_SCORE']}", axis=1)
-                
-                # Create NBA game link
-                def create_game_link(row):
-                    matchup = row['MATCHUP'].replace(' vs. ', '-vs-').replace(' @ ', '-vs-').lower()
-                    game_id = row['Game_ID']
-                    return f"https://www.nba.com/game/{matchup}-{game_id}"
-
-                games_display['GAME_LINK'] = games_display.apply(create_game_link, axis=1)
-                
-                # Highlight wins and losses
-                def highlight_result(row):
-                    if 'WL' not in row:
-                        return [''] * len(row)
-                    if row['WL'] == 'W':
-                        return ['background-color: lightgreen'] * len(row)
-                    elif row['WL'] == 'L':
-                        return ['background-color: lightcoral'] * len(row)
-                    else:
-                        return [''] * len(row)
-                
-                # Rename and select columns for display
-                games_display = games_display.rename(columns={
-                    'GAME_DATE': 'Date',
-                    'OPPONENT': 'Opponent',
-                })[['Date', 'Opponent', 'SCORE', 'WL', 'GAME_LINK']]  # Include 'WL' column for highlighting
-                
-                # Display the games with highlighting
-                st.dataframe(games_display.style.apply(highlight_result, axis=1), 
+                # Display the games with wins and losses highlighted
+                st.dataframe(games_display.style.apply(result_styles, axis=None), 
                              column_config={
                                  "Date": st.column_config.TextColumn("Date"),
                                 "Opponent": st.column_config.TextColumn("Opponent"),
@@ -177,17 +172,11 @@ def show_teams():
                                 "GAME_LINK": st.column_config.LinkColumn("Game Link")
                             },
                              hide_index=True)
-                
-                
-                # # Debug information
-                # st.write("Debug: Columns in games_display", games_display.columns)
-                # st.write("Debug: First few rows of games_display", games_display.head())
             else:
                 st.write(f"Unable to fetch game schedule for the {str(season)}-{str(season+1)} season.")
 
-        current_year = datetime.now().year
-        seasons = list(range(1990, current_year+1))
-        season = st.sidebar.number_input("Select a season", min_value=min(seasons), max_value=max(seasons), value=max(seasons), key='season_numeric_input')
+        current_season = current_season_start()
+        season = st.sidebar.number_input("Select a season", min_value=FIRST_SEASON, max_value=current_season, value=current_season, key='season_numeric_input')
         display_season_games(season)
     else:
         st.write("Please select a team to view details.")
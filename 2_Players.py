@@ -1,7 +1,5 @@
 import streamlit as st
-from nba_api.stats.static import players
-from utils import fetch_data
-from nba_api.stats.endpoints import commonplayerinfo, playergamelog
+from startup import mark_first_paint
 
 st.set_page_config(
     page_title="NBA Players", 
@@ -10,20 +8,38 @@ st.set_page_config(
 
 def show_players():
     st.title("NBA Players 🏃")
-    all_players = players.get_active_players()
-    player_names = [f"{player['first_name']} {player['last_name']}" for player in all_players]
-    selected_player = st.selectbox("Select a player", player_names)
+    mark_first_paint("Players")
 
-    if selected_player:
-        player = next(player for player in all_players if f"{player['first_name']} {player['last_name']}" == selected_player)
-        player_id = player['id']
+    # Imported after the title is drawn: pandas and the nba_api endpoints take a while to load
+    from utils import fetch_data, CURRENT_SEASON
+    from entities import get_player_index
+    from nba_api.stats.endpoints import commonplayerinfo, playergamelog
+    from player_stats import PlayerPerformance, prepare_game_log, rolling_averages
+    from assets import headshot
+    import pandas as pd
+
+    player_index = get_player_index()
+
+    # Active players by default, or any player in history matching the search
+    query = st.text_input("Search all players", placeholder="Name, including retired players")
+    candidates = player_index.search(query) if query else player_index.active
+    if not candidates:
+        st.write(f"No player found for \"{query}\".")
+        return
+    player_id = st.selectbox(
+        "Select a player",
+        [player['id'] for player in candidates],
+        format_func=lambda x: player_index.by_id[x]['full_name'] + ('' if player_index.by_id[x]['is_active'] else ' (retired)')
+    )
+
+    if player_id:
+        player = player_index.get(player_id)
+        selected_player = player['full_name']
         stats_nba_url = f"https://www.nba.com/stats/player/{player_id}"
         st.sidebar.markdown(f"## [{selected_player}]({stats_nba_url})")
         
-        # Get player image
-        image_url = f"https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{player_id}.png"
-        # Display player image in sidebar
-        st.sidebar.image(image_url, caption=selected_player)
+        # Player image, from the local asset cache
+        st.sidebar.image(headshot(player_id), caption=selected_player)
   
         player_info = fetch_data(commonplayerinfo.CommonPlayerInfo, player_id=player_id)
         
@@ -37,7 +53,7 @@ def show_players():
                 st.write(f"Country: {player_info.COUNTRY.iloc[0]}")
 
         # Fetch last game performance
-        game_log = fetch_data(playergamelog.PlayerGameLog, player_id=player_id, season='2023-24')
+        game_log = fetch_data(playergamelog.PlayerGameLog, player_id=player_id, season=CURRENT_SEASON)
         
         if game_log is not None and not game_log.empty:
             last_game = game_log.iloc[0]
@@ -57,6 +73,32 @@ def show_players():
             
             st.write(f"Game Date: {last_game['GAME_DATE']}")
             st.write(f"Matchup: {last_game['MATCHUP']}")
+
+            # Recent form against the season averages
+            performance = PlayerPerformance()
+            performance.update(game_log)
+            form = performance.summary().iloc[0]
+
+            st.subheader("Recent Form")
+            st.dataframe(pd.DataFrame({
+                'Last 5': [form['PTS_L5'], form['REB_L5'], form['AST_L5']],
+                'Last 10': [form['PTS_L10'], form['REB_L10'], form['AST_L10']],
+                'Last 20': [form['PTS_L20'], form['REB_L20'], form['AST_L20']],
+                'Season': [form['PTS'], form['REB'], form['AST']],
+                'Per 36': [form['PTS_PER36'], form['REB_PER36'], form['AST_PER36']],
+            }, index=['Points', 'Rebounds', 'Assists']).round(1))
+            col1, col2 = st.columns(2)
+            col1.metric("True Shooting", f"{form['TS_PCT']:.1%}")
+            col2.metric("Usage per 36", f"{form['USAGE_PER36']:.1f}")
+
+            # Game-by-game form: each game with the averages of the games up to it
+            stat = st.radio("Rolling average of", ['PTS', 'REB', 'AST'], horizontal=True,
+                            format_func={'PTS': "Points", 'REB': "Rebounds", 'AST': "Assists"}.get)
+            rolling = rolling_averages(prepare_game_log(game_log), windows=(5, 10), stats=[stat])
+            st.line_chart(
+                rolling.set_index('GAME_DATE')[[stat, f"{stat}_L5", f"{stat}_L10"]]
+                .rename(columns={stat: "Game", f"{stat}_L5": "Last 5", f"{stat}_L10": "Last 10"})
+            )
         else:
             st.write("No recent game data available for this player.")
 
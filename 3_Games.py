@@ -1,5 +1,5 @@
 import streamlit as st
-from utils import get_live_games, get_game_by_date
+from startup import mark_first_paint
 from datetime import date
 
 st.set_page_config(
@@ -14,7 +14,7 @@ st.set_page_config(
 # Define the function to get the game for the selected date
 def get_game_for_date(selected_date):
     if selected_date == date.today():
-        return get_live_games()  
+        return get_live_snapshot()
     else:
         return get_game_by_date(selected_date)
 
@@ -28,12 +28,19 @@ def display_fallback_content():
 
 # Main content
 st.title("NBA Games 🏀")
+mark_first_paint("Games")
+
+# Imported after the title is drawn: pandas and the nba_api endpoints take a while to load
+from utils import get_game_by_date
+from live import get_live_snapshot
+from games_dataset import FIRST_SEASON
+from assets import logo
 
 # Add calendar to sidebar
 st.sidebar.subheader("Select Date")
 selected_date = st.sidebar.date_input("Choose a date", 
                                        value=date.today(),
-                                       min_value=date(2024, 10, 1),
+                                       min_value=date(FIRST_SEASON, 10, 1),
                                        max_value=date.today())
 
 st.subheader(f"Games for {selected_date.strftime('%B %d, %Y')}")
@@ -45,7 +52,7 @@ if not games.empty:  # Correct way to check if DataFrame is not empty
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.image(f"https://cdn.nba.com/logos/nba/{game['homeTeamId']}/global/L/logo.svg", width=100)
+            st.image(logo(game['homeTeamId']), width=100)
             st.write(f"[{game['homeTeamName']}](/Teams?team_id={game['homeTeamId']})")
             st.write(f"Score: {game['homeTeamScore']}")
         
@@ -53,7 +60,7 @@ if not games.empty:  # Correct way to check if DataFrame is not empty
             st.markdown("# VS")
         
         with col3:
-            st.image(f"https://cdn.nba.com/logos/nba/{game['awayTeamId']}/global/L/logo.svg", width=100)
+            st.image(logo(game['awayTeamId']), width=100)
             st.write(f"[{game['awayTeamName']}](/Teams?team_id={game['awayTeamId']})")
             st.write(f"Score: {game['awayTeamScore']}")
         
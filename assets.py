@@ -0,0 +1,172 @@
+import base64
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+# Local cache of team logos and player headshots. Each image is downloaded once
+# per machine and then served by the app itself (local files to st.image, data
+# URIs in tables), so sessions no longer load them from the NBA CDNs. Headshots
+# are PNGs and get pre-rendered size variants; logos are SVGs, which scale by
+# themselves. Whatever cannot be downloaded falls back to the bundled basketball logo.
+
+# Next to the response cache (store.CACHE_DIR), resolved here without importing store, which
+# pulls in pandas: streamlit_app.py imports this module before the first page is painted
+ASSET_DIR = os.environ.get('NBA_ASSET_DIR', os.path.join(
+    os.path.dirname(os.environ.get('NBA_CACHE_DIR', os.path.join('.cache', 'nba_api'))), 'assets'))
+PLACEHOLDER = 'basketball_logo.png'
+
+LOGO_URL = "https://cdn.nba.com/logos/nba/{id}/global/L/logo.svg"
+HEADSHOT_URL = "https://ak-static.cms.nba.com/wp-content/uploads/headshots/nba/latest/260x190/{id}.png"
+HEADSHOT_SIZES = {'small': (65, 48), 'medium': (130, 95), 'large': (260, 190)}
+
+TIMEOUT = 5  # seconds per download
+RETRY_AFTER = 600  # seconds before an asset that failed to download is tried again
+MAX_WORKERS = 8
+
+_locks = {}
+_failed = {}
+_uris = {}
+_state_lock = threading.Lock()
+_executor = None
+_prewarmed = False
+
+def _submit(fn, *args):
+    # The pool is created on first use, so importing this module starts no threads
+    global _executor
+    with _state_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='assets')
+    return _executor.submit(fn, *args)
+
+def _path(kind, name):
+    return os.path.join(ASSET_DIR, kind, name)
+
+def _lock(key):
+    with _state_lock:
+        return _locks.setdefault(key, threading.Lock())
+
+def _download(url, path):
+    """Download url to path once. Returns False while the remote is failing."""
+    import requests
+
+    with _lock(path):
+        if os.path.exists(path):
+            return True
+        with _state_lock:
+            failed_at = _failed.get(path)
+        if failed_at is not None and time.monotonic() - failed_at < RETRY_AFTER:
+            return False
+        try:
+            with metrics.timer('nba_asset_download_seconds', kind=os.path.basename(os.path.dirname(path))):
+                response = requests.get(url, timeout=TIMEOUT)
+                response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Asset download failed ({url}): {e}")
+            metrics.count('nba_asset_downloads_failed_total')
+            with _state_lock:
+                _failed[path] = time.monotonic()
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name, so a file that exists is always complete
+        tmp = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp, path)
+        return True
+
+def logo(team_id):
+    """Local path of the team's logo, downloaded on first use (the placeholder if that fails)."""
+    path = _path('logos', f"{int(team_id)}.svg")
+    return path if _download(LOGO_URL.format(id=int(team_id)), path) else PLACEHOLDER
+
+def _resize(source, path, size):
+    from PIL import Image
+    with Image.open(source) as image:
+        image.thumbnail(size)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+        image.save(tmp, format='PNG', optimize=True)
+    os.replace(tmp, path)
+
+def headshot(player_id, size='large'):
+    """
+    Local path of a player's headshot in one of HEADSHOT_SIZES.
+
+    The original is downloaded on first use and every size is rendered from it
+    at once; players without a headshot get the placeholder in that size, and
+    a download that is not an image falls back to the remote URL.
+    """
+    from PIL import UnidentifiedImageError
+
+    url = HEADSHOT_URL.format(id=int(player_id))
+    original = _path('headshots', f"{int(player_id)}.png")
+    if not _download(url, original):
+        return placeholder(size)
+    path = _path('headshots', f"{int(player_id)}_{size}.png")
+    if not os.path.exists(path):
+        with _lock(original):
+            try:
+                for name, dimensions in HEADSHOT_SIZES.items():
+                    variant = _path('headshots', f"{int(player_id)}_{name}.png")
+                    if not os.path.exists(variant):
+                        _resize(original, variant, dimensions)
+            except UnidentifiedImageError as e:
+                # An error page or cdn placeholder served with a 200: dropped and downloaded again after RETRY_AFTER
+                print(f"Asset is not an image ({url}): {e}")
+                metrics.count('nba_asset_downloads_failed_total')
+                os.remove(original)
+                with _state_lock:
+                    _failed[original] = time.monotonic()
+                return url
+    return path
+
+def placeholder(size='large'):
+    path = _path('placeholder', f"{size}.png")
+    if not os.path.exists(path):
+        with _lock(path):
+            _resize(PLACEHOLDER, path, HEADSHOT_SIZES[size])
+    return path
+
+def data_uri(path):
+    with _state_lock:
+        uri = _uris.get(path)
+    if uri is None:
+        mime = 'image/svg+xml' if path.endswith('.svg') else 'image/png'
+        with open(path, 'rb') as f:
+            uri = f"data:{mime};base64," + base64.b64encode(f.read()).decode()
+        with _state_lock:
+            _uris[path] = uri
+    return uri
+
+def logo_uris(team_ids):
+    """
+    Data URIs of the teams' logos for image columns, one per team id.
+
+    Never waits on the network: logos not cached yet are downloaded in the
+    background and shown as the placeholder until then.
+    """
+    uris = {}
+    for team_id in team_ids.unique():
+        path = _path('logos', f"{int(team_id)}.svg")
+        if os.path.exists(path):
+            uris[team_id] = data_uri(path)
+        else:
+            _submit(logo, team_id)
+            uris[team_id] = data_uri(placeholder('small'))
+    return team_ids.map(uris)
+
+def _prewarm():
+    from nba_api.stats.static import teams
+    for team in teams.get_teams():
+        _submit(logo, team['id'])
+
+def prewarm_logos():
+    """Download the logos of all 30 teams in the background, once per process."""
+    global _prewarmed
+    with _state_lock:
+        if _prewarmed:
+            return
+        _prewarmed = True
+    _submit(_prewarm)
@@ -0,0 +1,163 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils import load_season, probability_to_odds
+from elo import INITIAL_ELO, K_FACTOR, CARRY_OVER, replay
+
+# Backtest of the Elo odds model over past seasons.
+#
+# The app prices games with plain Elo (no home advantage). The simulated bettor
+# estimates probabilities from the same rolling ratings plus a home-court bonus,
+# and bets whenever that estimate beats the offered odds. The bettor's ROI is
+# what the app would lose to such a strategy (a negative ROI means the odds hold).
+
+HOME_ADVANTAGE = 100  # Elo points the bettor adds to the home team
+
+def load_games(seasons, path=None):
+    """
+    Game table of several seasons, sorted chronologically, with a 'season' column.
+
+    :param seasons: Season strings such as '2022-23'
+    :param path: Optional Parquet or CSV file with a prepared game table (for offline runs)
+    """
+    if path:
+        games = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, dtype={'gameId': str})
+        if 'season' not in games:
+            games['season'] = ''
+    else:
+        games = pd.concat([load_season(season).assign(season=season) for season in seasons], ignore_index=True)
+    games['gameDate'] = games['gameDate'].astype(str).str[:10]
+    return games.sort_values(['gameDate', 'gameId'], ignore_index=True)
+
+def pregame_probabilities(games, k=K_FACTOR, home_advantage=0):
+    """
+    Pre-game home win probability of every game from a rolling Elo state.
+
+    Ratings start at INITIAL_ELO and regress towards it between seasons.
+    """
+    team_ids, team_index = np.unique(games[['homeTeamId', 'awayTeamId']].to_numpy(dtype='int64'), return_inverse=True)
+    team_index = team_index.reshape(-1, 2)
+    home, away = team_index[:, 0], team_index[:, 1]
+    home_score = games['homeTeamScore'].to_numpy(dtype=float)
+    away_score = games['awayTeamScore'].to_numpy(dtype=float)
+    days = games['gameDate'].to_numpy()
+    seasons = games['season'].astype(str).to_numpy()
+
+    ratings = np.full(len(team_ids), float(INITIAL_ELO))
+    probabilities = np.empty(len(games))
+    starts = np.flatnonzero(np.r_[True, seasons[1:] != seasons[:-1]]) if len(games) else []
+    ends = np.r_[starts[1:], len(games)] if len(games) else []
+    for start, end in zip(starts, ends):
+        ratings[:] = CARRY_OVER * ratings + (1 - CARRY_OVER) * INITIAL_ELO
+        window = slice(start, end)
+        probabilities[window] = replay(
+            ratings, home[window], away[window], home_score[window], away_score[window], days[window], k
+        )
+    if home_advantage:
+        # P = 1 / (1 + 10^(-d/400)), so shifting d is a change in log-odds
+        logit = np.log(probabilities / (1 - probabilities)) + home_advantage * np.log(10) / 400
+        probabilities = 1 / (1 + np.exp(-logit))
+    return probabilities
+
+def calibration(probabilities, outcomes, buckets=10):
+    bucket = np.minimum((probabilities * buckets).astype(int), buckets - 1)
+    counts = np.bincount(bucket, minlength=buckets)
+    predicted = np.bincount(bucket, weights=probabilities, minlength=buckets)
+    observed = np.bincount(bucket, weights=outcomes, minlength=buckets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return pd.DataFrame({
+            'bucket': [f"{i / buckets:.1f}-{(i + 1) / buckets:.1f}" for i in range(buckets)],
+            'games': counts,
+            'predicted': predicted / counts,
+            'observed': observed / counts,
+        })
+
+def simulate_bets(p_bettor, home_odds, away_odds, home_won, stake=1.0, kelly_fraction=0.25, bankroll=100.0):
+    """
+    Flat-stake and fractional-Kelly results of betting the side with positive expected value.
+
+    :return: Dict of strategy name to {'bets', 'staked', 'profit', 'roi'}
+    """
+    # Pick the side with the larger edge, and only bet when the edge is positive
+    edge_home = p_bettor * home_odds - 1
+    edge_away = (1 - p_bettor) * away_odds - 1
+    bet_home = edge_home >= edge_away
+    odds = np.where(bet_home, home_odds, away_odds)
+    edge = np.where(bet_home, edge_home, edge_away)
+    placed = edge > 0
+    won = np.where(bet_home, home_won, ~home_won)
+    # Profit per unit staked
+    unit = np.where(won, odds - 1, -1.0)
+
+    flat_stakes = np.where(placed, stake, 0.0)
+    flat_profit = float((flat_stakes * unit).sum())
+
+    # Kelly: stake f = edge / (odds - 1) of the current bankroll, compounded game after game
+    f = np.where(placed, kelly_fraction * edge / (odds - 1), 0.0)
+    growth = np.cumprod(1 + f * unit)
+    bankroll_before = bankroll * np.r_[1.0, growth[:-1]]
+    kelly_stakes = f * bankroll_before
+    kelly_profit = float(bankroll * growth[-1] - bankroll) if len(growth) else 0.0
+
+    def result(stakes, profit):
+        staked = float(stakes.sum())
+        return {
+            'bets': int((stakes > 0).sum()),
+            'staked': staked,
+            'profit': profit,
+            'roi': profit / staked * 100 if staked else 0.0,
+        }
+
+    return {
+        'flat': result(flat_stakes, flat_profit),
+        'kelly': result(kelly_stakes, kelly_profit),
+    }
+
+def run_backtest(games, margin=0.0, home_advantage=HOME_ADVANTAGE, stake=1.0, kelly_fraction=0.25):
+    """Score the app's odds over a game table and simulate betting against them."""
+    games = games[games['homeTeamScore'] != games['awayTeamScore']]
+    home_won = (games['homeTeamScore'] > games['awayTeamScore']).to_numpy()
+    outcomes = home_won.astype(float)
+
+    p_model = pregame_probabilities(games)
+    p_bettor = pregame_probabilities(games, home_advantage=home_advantage) if home_advantage else p_model
+
+    # Odds exactly as the app offers them: probability rounded to 2 decimals
+    p_offered = np.clip(np.round(p_model, 2), 0.01, 0.99)
+    home_odds = probability_to_odds(p_offered, margin)
+    away_odds = probability_to_odds(np.round(1 - p_offered, 2), margin)
+
+    clipped = np.clip(p_model, 1e-12, 1 - 1e-12)
+    return {
+        'games': len(games),
+        'brier': float(np.mean((p_model - outcomes) ** 2)),
+        'log_loss': float(-np.mean(outcomes * np.log(clipped) + (1 - outcomes) * np.log(1 - clipped))),
+        'accuracy': float(np.mean((p_model > 0.5) == home_won)),
+        'calibration': calibration(p_model, outcomes),
+        'strategies': simulate_bets(p_bettor, home_odds, away_odds, home_won, stake, kelly_fraction),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the Elo odds model over past seasons.")
+    parser.add_argument('seasons', nargs='*', default=['2021-22', '2022-23', '2023-24'], help="Seasons such as 2023-24")
+    parser.add_argument('--games', help="Parquet or CSV game table to use instead of fetching seasons")
+    parser.add_argument('--margin', type=float, default=0.0, help="Bookmaker margin applied to the odds")
+    parser.add_argument('--home-advantage', type=float, default=HOME_ADVANTAGE, help="Bettor's home bonus in Elo points")
+    parser.add_argument('--kelly-fraction', type=float, default=0.25)
+    args = parser.parse_args()
+
+    games = load_games(args.seasons, args.games)
+    start = time.perf_counter()
+    report = run_backtest(games, args.margin, args.home_advantage, kelly_fraction=args.kelly_fraction)
+    elapsed = time.perf_counter() - start
+
+    print(f"{report['games']:,} games backtested in {elapsed * 1000:.1f} ms")
+    print(f"Brier score: {report['brier']:.4f}  Log-loss: {report['log_loss']:.4f}  Accuracy: {report['accuracy']:.1%}")
+    print(report['calibration'].to_string(index=False))
+    for name, result in report['strategies'].items():
+        print(f"{name}: {result['bets']} bets, staked {result['staked']:.2f}, "
+              f"profit {result['profit']:.2f}, ROI {result['roi']:.1f}%")
+
+if __name__ == "__main__":
+    main()
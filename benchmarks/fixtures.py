@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store
+
+# Fixtures of the upstream responses the app reads, replayed by run.py through
+# the on-disk response cache (store.py) so no benchmark touches the network:
+#
+#   scoreboard.json           live ScoreBoard games (get_dict() of board.games)
+#   LeagueGameFinder.parquet  one season of team game rows
+#   TeamGameLog.parquet       one team's season log
+#   CommonTeamRoster.parquet  that team's roster
+#   PlayerCareerStats.parquet career stats of every roster player
+#   fixture.json              team_id, season and how the fixtures were made
+#
+# `python benchmarks/fixtures.py --record` saves real responses (needs network);
+# without it, deterministic synthetic responses with the same columns are generated,
+# seeded from the 2024-10-26 scoreboard in 2024-10-26_games.csv.
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_GAMES = os.path.join(REPO_DIR, '2024-10-26_games.csv')
+SEASON = '2024-25'
+TEAM_ID = 1610612747  # Lakers
+SEASON_GAMES = 1230
+ROSTER_SIZE = 17
+
+def _teams():
+    from nba_api.stats.static import teams
+    return pd.DataFrame(teams.get_teams()).sort_values('id', ignore_index=True)
+
+def _box_columns(rng, n, minutes=240):
+    # Shooting and box score columns shared by LeagueGameFinder and TeamGameLog rows
+    fga = rng.integers(75, 100, n)
+    fgm = (fga * rng.uniform(0.4, 0.52, n)).astype(int)
+    fg3a = rng.integers(25, 45, n)
+    fg3m = (fg3a * rng.uniform(0.3, 0.42, n)).astype(int)
+    fta = rng.integers(12, 30, n)
+    ftm = (fta * rng.uniform(0.7, 0.85, n)).astype(int)
+    oreb = rng.integers(5, 15, n)
+    dreb = rng.integers(28, 40, n)
+    return {
+        'MIN': np.full(n, minutes), 'FGM': fgm, 'FGA': fga, 'FG_PCT': (fgm / fga).round(3),
+        'FG3M': fg3m, 'FG3A': fg3a, 'FG3_PCT': (fg3m / fg3a).round(3),
+        'FTM': ftm, 'FTA': fta, 'FT_PCT': (ftm / fta).round(3),
+        'OREB': oreb, 'DREB': dreb, 'REB': oreb + dreb,
+        'AST': rng.integers(18, 32, n), 'STL': rng.integers(4, 12, n), 'BLK': rng.integers(2, 9, n),
+        'TOV': rng.integers(8, 18, n), 'PF': rng.integers(14, 24, n),
+        'PTS': 2 * fgm + fg3m + ftm,
+    }
+
+def scoreboard_games(sample=SAMPLE_GAMES):
+    # Live scoreboard payload of the sample day, in the nested form of ScoreBoard().games.get_dict()
+    sample = pd.read_csv(sample, dtype={'gameId': str}, index_col=0, encoding='utf-8-sig')
+    teams = _teams().set_index('id')
+    games = []
+    for row in sample.itertuples():
+        side = {}
+        for prefix in ('home', 'away'):
+            team_id = int(getattr(row, f'{prefix}TeamId'))
+            side[prefix] = {
+                'teamId': team_id,
+                'teamName': getattr(row, f'{prefix}TeamName'),
+                'teamCity': teams.loc[team_id, 'city'],
+                'teamTricode': teams.loc[team_id, 'abbreviation'],
+                'wins': 0, 'losses': 0,
+                'score': int(getattr(row, f'{prefix}TeamScore')),
+                'seed': None, 'inBonus': None, 'timeoutsRemaining': 0, 'periods': [],
+            }
+        games.append({
+            'gameId': row.gameId, 'gameCode': f"{row.gameDate.replace('-', '')}/{side['away']['teamTricode']}{side['home']['teamTricode']}",
+            'gameStatus': 3, 'gameStatusText': row.gameStatusText, 'period': 4, 'gameClock': '',
+            'gameTimeUTC': f"{row.gameDate}T23:30:00Z", 'gameEt': f"{row.gameDate}T19:30:00Z",
+            'regulationPeriods': 4, 'ifNecessary': False, 'seriesGameNumber': '', 'seriesText': '',
+            'homeTeam': side['home'], 'awayTeam': side['away'], 'gameLeaders': {}, 'pbOdds': {},
+        })
+    return games
+
+def league_game_finder(rng, season=SEASON, n_games=SEASON_GAMES):
+    teams = _teams()
+    home = rng.integers(0, len(teams), n_games)
+    away = (home + rng.integers(1, len(teams), n_games)) % len(teams)
+    days = pd.Timestamp(f"{season[:4]}-10-22") + pd.to_timedelta(np.sort(rng.integers(0, 170, n_games)), unit='D')
+    game_ids = np.array([f"002{season[2:4]}{i:05d}" for i in range(1, n_games + 1)], dtype=object)
+
+    rows = []
+    for team, opponent, matchup in ((home, away, ' vs. '), (away, home, ' @ ')):
+        box = _box_columns(rng, n_games)
+        rows.append(pd.DataFrame({
+            'SEASON_ID': f"2{season[:4]}",
+            'TEAM_ID': teams['id'].to_numpy()[team],
+            'TEAM_ABBREVIATION': teams['abbreviation'].to_numpy()[team],
+            'TEAM_NAME': teams['full_name'].to_numpy()[team],
+            'GAME_ID': game_ids,
+            'GAME_DATE': days.strftime('%Y-%m-%d'),
+            'MATCHUP': teams['abbreviation'].to_numpy()[team] + matchup + teams['abbreviation'].to_numpy()[opponent],
+            **box,
+        }))
+    finder = pd.concat(rows, ignore_index=True)
+    # Each game's two rows share one result
+    opponent_pts = finder.groupby('GAME_ID')['PTS'].transform('sum') - finder['PTS']
+    finder['PTS'] = finder['PTS'].where(finder['PTS'] != opponent_pts, finder['PTS'] + 1)
+    opponent_pts = finder.groupby('GAME_ID')['PTS'].transform('sum') - finder['PTS']
+    finder['WL'] = np.where(finder['PTS'] > opponent_pts, 'W', 'L')
+    finder['PLUS_MINUS'] = (finder['PTS'] - opponent_pts).astype(float)
+    from nba_api.stats.endpoints import leaguegamefinder
+    columns = leaguegamefinder.LeagueGameFinder.expected_data['LeagueGameFinderResults']
+    return finder[columns].sort_values(['GAME_DATE', 'GAME_ID'], ascending=False, ignore_index=True)
+
+def team_game_log(finder, team_id=TEAM_ID):
+    # The team's rows of the season, in TeamGameLog's shape (newest first, running record)
+    log = finder[finder['TEAM_ID'] == team_id].sort_values('GAME_DATE', ignore_index=True)
+    wins = (log['WL'] == 'W').cumsum()
+    losses = (log['WL'] == 'L').cumsum()
+    log = log.assign(
+        Team_ID=log['TEAM_ID'], Game_ID=log['GAME_ID'],
+        GAME_DATE=pd.to_datetime(log['GAME_DATE']).dt.strftime('%b %d, %Y').str.upper(),
+        W=wins, L=losses, W_PCT=(wins / (wins + losses)).round(3),
+    )
+    from nba_api.stats.endpoints import teamgamelog
+    return log[teamgamelog.TeamGameLog.expected_data['TeamGameLog']].iloc[::-1].reset_index(drop=True)
+
+def common_team_roster(rng, season=SEASON, team_id=TEAM_ID, size=ROSTER_SIZE, first_player_id=1630000):
+    player_ids = first_player_id + np.arange(size)
+    return pd.DataFrame({
+        'TeamID': team_id, 'SEASON': season[:4], 'LeagueID': '00',
+        'PLAYER': [f"Player {i}" for i in range(size)],
+        'PLAYER_SLUG': [f"player-{i}" for i in range(size)],
+        'NUM': rng.integers(0, 99, size).astype(str),
+        'POSITION': rng.choice(['G', 'F', 'C', 'G-F', 'F-C'], size),
+        'HEIGHT': rng.choice(['6-3', '6-6', '6-9', '7-0'], size),
+        'WEIGHT': rng.integers(180, 260, size).astype(str),
+        'BIRTH_DATE': 'JAN 01, 2000', 'AGE': rng.integers(19, 38, size).astype(float),
+        'EXP': rng.integers(0, 15, size).astype(str), 'SCHOOL': 'School',
+        'PLAYER_ID': player_ids,
+    })
+
+# Per-game ranges of the counting stats in career rows
+PLAYER_PER_GAME = {
+    'FGA': (2, 19), 'FG3A': (0.5, 8), 'FTA': (0.5, 7),
+    'OREB': (0, 3), 'DREB': (1, 8), 'AST': (0, 8), 'STL': (0, 2), 'BLK': (0, 2), 'TOV': (0, 4), 'PF': (1, 4),
+}
+
+def player_career_stats(rng, roster, last_season=SEASON):
+    # Regular season totals, one row per season played
+    from nba_api.stats.endpoints import playercareerstats
+    columns = playercareerstats.PlayerCareerStats.expected_data['SeasonTotalsRegularSeason']
+    frames = []
+    for player_id, experience in zip(roster['PLAYER_ID'], roster['EXP'].replace('R', '0').astype(int)):
+        seasons = int(last_season[:4]) - np.arange(experience, -1, -1)
+        n = len(seasons)
+        gp = rng.integers(20, 82, n)
+        box = {column: (gp * rng.uniform(low, high, n)).round() for column, (low, high) in PLAYER_PER_GAME.items()}
+        box.update(FGM=(box['FGA'] * rng.uniform(0.4, 0.55, n)).round(),
+                   FG3M=(box['FG3A'] * rng.uniform(0.3, 0.4, n)).round(),
+                   FTM=(box['FTA'] * rng.uniform(0.7, 0.9, n)).round())
+        frames.append(pd.DataFrame({
+            'PLAYER_ID': player_id,
+            'SEASON_ID': [f"{season}-{str(season + 1)[-2:]}" for season in seasons],
+            'LEAGUE_ID': '00', 'TEAM_ID': TEAM_ID, 'TEAM_ABBREVIATION': 'LAL',
+            'PLAYER_AGE': 20.0 + np.arange(n), 'GP': gp, 'GS': (gp * rng.uniform(0, 1, n)).round(),
+            'MIN': (gp * rng.uniform(10, 36, n)).round(),
+            'FG_PCT': (box['FGM'] / box['FGA']).round(3), 'FG3_PCT': (box['FG3M'] / box['FG3A']).round(3),
+            'FT_PCT': (box['FTM'] / box['FTA']).round(3),
+            'REB': box['OREB'] + box['DREB'], 'PTS': 2 * box['FGM'] + box['FG3M'] + box['FTM'],
+            **box,
+        }))
+    return pd.concat(frames, ignore_index=True)[columns]
+
+def generate(path=FIXTURES_DIR, seed=0):
+    rng = np.random.default_rng(seed)
+    finder = league_game_finder(rng)
+    roster = common_team_roster(rng)
+    write(path, {
+        'scoreboard': scoreboard_games(),
+        'LeagueGameFinder': finder,
+        'TeamGameLog': team_game_log(finder),
+        'CommonTeamRoster': roster,
+        'PlayerCareerStats': player_career_stats(rng, roster),
+    }, {'team_id': TEAM_ID, 'season': SEASON, 'source': 'generated', 'seed': seed})
+
+def record(path=FIXTURES_DIR, season=SEASON, team_id=TEAM_ID):
+    from nba_api.live.nba.endpoints import scoreboard
+    from nba_api.stats.endpoints import leaguegamefinder, teamgamelog, commonteamroster, playercareerstats
+
+    roster = commonteamroster.CommonTeamRoster(team_id=team_id, timeout=60).get_data_frames()[0]
+    write(path, {
+        'scoreboard': scoreboard.ScoreBoard().games.get_dict(),
+        'LeagueGameFinder': leaguegamefinder.LeagueGameFinder(
+            league_id_nullable='00', season_nullable=season, timeout=60).get_data_frames()[0],
+        'TeamGameLog': teamgamelog.TeamGameLog(team_id=team_id, season=season[:4], timeout=60).get_data_frames()[0],
+        'CommonTeamRoster': roster,
+        'PlayerCareerStats': pd.concat([
+            playercareerstats.PlayerCareerStats(player_id=player_id, timeout=60).get_data_frames()[0]
+            for player_id in roster['PLAYER_ID']
+        ], ignore_index=True),
+    }, {'team_id': team_id, 'season': season, 'source': 'recorded'})
+
+def write(path, fixtures, meta):
+    os.makedirs(path, exist_ok=True)
+    for name, data in fixtures.items():
+        if name == 'scoreboard':
+            with open(os.path.join(path, 'scoreboard.json'), 'w') as f:
+                json.dump(data, f)
+        else:
+            data.to_parquet(os.path.join(path, f"{name}.parquet"), index=False)
+    with open(os.path.join(path, 'fixture.json'), 'w') as f:
+        json.dump(meta, f)
+
+def load(path=FIXTURES_DIR):
+    """Fixtures as a dict of name -> DataFrame (list of game dicts for the scoreboard), plus 'meta'."""
+    if not os.path.exists(os.path.join(path, 'fixture.json')):
+        generate(path)
+    with open(os.path.join(path, 'fixture.json')) as f:
+        fixtures = {'meta': json.load(f)}
+    with open(os.path.join(path, 'scoreboard.json')) as f:
+        fixtures['scoreboard'] = json.load(f)
+    for name in ('LeagueGameFinder', 'TeamGameLog', 'CommonTeamRoster', 'PlayerCareerStats'):
+        fixtures[name] = pd.read_parquet(os.path.join(path, f"{name}.parquet"))
+    return fixtures
+
+def scale(fixtures, factor):
+    """
+    Fixtures grown factor times: more scoreboard games, season games and roster
+    players, each copy with its own ids.
+    """
+    if factor == 1:
+        return fixtures
+    scaled = dict(fixtures)
+    scaled['scoreboard'] = [
+        dict(game, gameId=f"{int(game['gameId']) + copy * 100000:010d}")
+        for copy in range(factor) for game in fixtures['scoreboard']
+    ]
+    finder = fixtures['LeagueGameFinder']
+    game_ids = pd.to_numeric(finder['GAME_ID'])
+    scaled['LeagueGameFinder'] = pd.concat([
+        finder.assign(GAME_ID=(game_ids + copy * 1000000).map('{:010d}'.format)) for copy in range(factor)
+    ], ignore_index=True)
+    roster, careers = fixtures['CommonTeamRoster'], fixtures['PlayerCareerStats']
+    offset = 100000
+    scaled['CommonTeamRoster'] = pd.concat([
+        roster.assign(PLAYER_ID=roster['PLAYER_ID'] + copy * offset) for copy in range(factor)
+    ], ignore_index=True)
+    scaled['PlayerCareerStats'] = pd.concat([
+        careers.assign(PLAYER_ID=careers['PLAYER_ID'] + copy * offset) for copy in range(factor)
+    ], ignore_index=True)
+    return scaled
+
+def install(fixtures):
+    """Save the fixtures in the response cache under the requests the app makes."""
+    from nba_api.stats.endpoints import leaguegamefinder, teamgamelog, commonteamroster, playercareerstats
+
+    meta = fixtures['meta']
+    store.save(leaguegamefinder.LeagueGameFinder, {'league_id_nullable': '00', 'season_nullable': meta['season']},
+               fixtures['LeagueGameFinder'])
+    store.save(teamgamelog.TeamGameLog, {'team_id': meta['team_id'], 'season': int(meta['season'][:4])},
+               fixtures['TeamGameLog'])
+    # The team's games of every season, as the Teams page requests them (team_logs.py)
+    finder = fixtures['LeagueGameFinder']
+    store.save(leaguegamefinder.LeagueGameFinder, {'team_id_nullable': meta['team_id'], 'league_id_nullable': '00'},
+               finder[finder['TEAM_ID'] == meta['team_id']].reset_index(drop=True))
+    store.save(commonteamroster.CommonTeamRoster, {'team_id': meta['team_id']}, fixtures['CommonTeamRoster'])
+    for player_id, stats in fixtures['PlayerCareerStats'].groupby('PLAYER_ID'):
+        store.save(playercareerstats.PlayerCareerStats, {'player_id': player_id}, stats.reset_index(drop=True))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or record the benchmark fixtures.")
+    parser.add_argument('--record', action='store_true', help="Record real responses instead (needs network)")
+    parser.add_argument('--season', default=SEASON)
+    parser.add_argument('--team-id', type=int, default=TEAM_ID)
+    parser.add_argument('--path', default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.path, args.season, args.team_id)
+    else:
+        generate(args.path)
+    print(f"Fixtures written to {args.path}")
+
+if __name__ == "__main__":
+    main()
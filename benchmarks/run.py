@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import assets
+import fixtures
+import games_dataset
+import store
+import utils
+from elo import EloEngine
+from settlement import settle_bets
+from team_logs import get_team_season_log, invalidate_team_history
+from startup import git_revision
+
+# End-to-end benchmarks of the app's data paths, replayed from the fixtures in
+# benchmarks/fixtures (see fixtures.py) at realistic size and scaled 10x and 100x.
+# Each run appends one JSON line per benchmark and scale to RESULTS, tagged with
+# the git revision, so runs of different commits can be compared:
+#
+#   python benchmarks/run.py                  run and record
+#   python benchmarks/run.py --compare        also compare with the previous revision
+#   python benchmarks/run.py --compare --check  exit with 1 on a regression
+
+RESULTS = os.path.join(REPO_DIR, 'benchmarks', 'results.jsonl')
+SCALES = (1, 10, 100)
+REPEATS = 3
+BETS = 1000  # bets settled at scale 1
+REGRESSION = 1.25  # best time ratio to the baseline reported as a regression
+
+def measure(fn, setup=None, repeats=REPEATS):
+    """Best and median wall time (ms) over repeats, and peak traced memory (MB) of one more run."""
+    times = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'best_ms': min(times), 'median_ms': statistics.median(times), 'peak_mb': peak / 1e6}
+
+def random_bets(games, n_bets, seed=0):
+    # Bets on the season's games, a few on unknown games so some stay pending
+    rng = np.random.default_rng(seed)
+    games = utils.expand_game_table(games)
+    picks = rng.integers(0, len(games), n_bets)
+    home = rng.random(n_bets) < 0.5
+    picked = games.iloc[picks]
+    game_ids = picked['gameId'].to_numpy(copy=True)
+    game_ids[rng.random(n_bets) < 0.05] = '0029999999'
+    return pd.DataFrame({
+        'game_id': game_ids,
+        'home_team': picked['homeTeamName'].to_numpy(),
+        'away_team': picked['awayTeamName'].to_numpy(),
+        'chosen_team': np.where(home, picked['homeTeamName'], picked['awayTeamName']),
+        'odds': rng.uniform(1.1, 4.0, n_bets).round(2),
+        'stake': rng.integers(1, 100, n_bets).astype(float),
+    })
+
+def seed_logos(team_ids):
+    # A warm logo cache, so pricing games reads local files instead of queueing downloads from the cdn
+    svg = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1 1"/>'
+    for team_id in pd.unique(team_ids):
+        path = assets._path('logos', f"{int(team_id)}.svg")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(svg)
+
+def run_scale(data, factor, repeats, only=None):
+    data = fixtures.scale(data, factor)
+    meta = data['meta']
+    season = meta['season']
+    from nba_api.stats.endpoints import teamgamelog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Replay through a private response cache and game dataset, never upstream
+        store.CACHE_DIR = os.path.join(tmp, 'nba_api')
+        games_dataset.DATA_DIR = os.path.join(tmp, 'games')
+        assets.ASSET_DIR = os.path.join(tmp, 'assets')
+        utils.set_data_source(utils.ReplaySource())
+        fixtures.install(data)
+
+        def cold_game_table():
+            utils.invalidate_game_table()
+            shutil.rmtree(games_dataset.DATA_DIR, ignore_errors=True)
+
+        games = utils.get_past_games(season)
+        live = utils.parse_scoreboard(data['scoreboard'])
+        seed_logos(pd.concat([live['homeTeamId'], live['awayTeamId']]))
+        engine = EloEngine(season)
+        engine.update(games)
+        ratings = engine.ratings_by_team()
+        bets = random_bets(games, BETS * factor)
+        roster = data['CommonTeamRoster']
+
+        benchmarks = {
+            'get_live_games': (lambda: utils.parse_scoreboard(data['scoreboard']), None, len(live)),
+            'get_past_games_cold': (lambda: utils.get_past_games(season), cold_game_table, len(games)),
+            'get_past_games_warm': (lambda: utils.get_past_games(season), None, len(games)),
+            'format_games': (lambda: utils.price_games(live, ratings), None, len(live)),
+            'settle_bets': (lambda: settle_bets(bets, games), None, len(bets)),
+            'team_game_log': (lambda: utils.fetch_data(teamgamelog.TeamGameLog, team_id=meta['team_id'],
+                                                       season=int(season[:4])), None, len(data['TeamGameLog'])),
+            'team_season_log_cold': (lambda: get_team_season_log(meta['team_id'], int(season[:4])),
+                                     invalidate_team_history, len(data['TeamGameLog']) * factor),
+            'team_season_log_warm': (lambda: get_team_season_log(meta['team_id'], int(season[:4])),
+                                     None, len(data['TeamGameLog']) * factor),
+            'teams_roster': (lambda: utils.roster_table(roster, utils.fetch_player_stats_batch(roster['PLAYER_ID'])),
+                             None, len(roster)),
+        }
+        results = []
+        for name, (fn, setup, rows) in benchmarks.items():
+            if only and name not in only:
+                continue
+            results.append(dict(benchmark=name, scale=factor, rows=rows, **measure(fn, setup, repeats)))
+        utils.invalidate_game_table()
+        invalidate_team_history()
+        return results
+
+def load_results(path=RESULTS):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+def compare(current, history, baseline=None):
+    """Best time and peak memory of the current run relative to the baseline revision's latest run."""
+    previous = history[history['revision'] != current['revision'].iloc[0]]
+    if previous.empty:
+        return None
+    # By default the most recently recorded other revision
+    previous = previous[previous['revision'] == (baseline or previous['revision'].iloc[-1])]
+    previous = previous[previous['time'] == previous['time'].max()]
+    merged = current.merge(previous, on=['benchmark', 'scale'], suffixes=('', '_baseline'))
+    merged['time_ratio'] = merged['best_ms'] / merged['best_ms_baseline']
+    merged['memory_ratio'] = merged['peak_mb'] / merged['peak_mb_baseline'].where(merged['peak_mb_baseline'] > 0)
+    return merged[['benchmark', 'scale', 'revision_baseline', 'best_ms_baseline', 'best_ms', 'time_ratio',
+                   'peak_mb_baseline', 'peak_mb', 'memory_ratio']]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's data paths on recorded fixtures.")
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES), help="Fixture scale factors")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--only', nargs='+', help="Only these benchmarks")
+    parser.add_argument('--fixtures', default=fixtures.FIXTURES_DIR, help="Fixtures directory")
+    parser.add_argument('--results', default=RESULTS, help="JSON lines file the results are appended to")
+    parser.add_argument('--compare', nargs='?', const='', metavar='REVISION',
+                        help="Compare with a revision's results (default: the previous revision recorded)")
+    parser.add_argument('--check', action='store_true', help=f"Exit with 1 if any benchmark is {REGRESSION}x slower")
+    args = parser.parse_args()
+
+    os.chdir(REPO_DIR)  # the Elo seed ratings are read relative to the repo
+    data = fixtures.load(args.fixtures)
+    revision, now = git_revision(), time.time()
+    rows = []
+    for factor in args.scales:
+        for result in run_scale(data, factor, args.repeats, args.only):
+            rows.append(dict(result, revision=revision, time=now, fixtures=data['meta']['source']))
+    current = pd.DataFrame(rows)
+
+    pd.set_option('display.width', 160)
+    print(current[['benchmark', 'scale', 'rows', 'best_ms', 'median_ms', 'peak_mb']].round(3).to_string(index=False))
+
+    history = load_results(args.results)
+    with open(args.results, 'a') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+    if args.compare is None:
+        return
+    comparison = compare(current, history, args.compare or None) if not history.empty else None
+    if comparison is None:
+        print("No earlier results to compare with.")
+        return
+    print()
+    print(comparison.round(3).to_string(index=False))
+    regressions = comparison[comparison['time_ratio'] > REGRESSION]
+    if not regressions.empty:
+        print(f"\n{len(regressions)} benchmark(s) at least {REGRESSION}x slower than {regressions['revision_baseline'].iloc[0]}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
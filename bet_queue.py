@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+import store
+
+# Write-behind queue for bet placement. Bets are validated against the current
+# odds, appended to a local SQLite write-ahead queue and acknowledged at once; a
+# background thread flushes them to the bets table in batches. Every bet carries
+# an idempotency key, so a batch that is retried after a failure never double-books.
+# While the ledger is unreachable, flushes are retried with a growing delay and
+# nothing is dropped. A batch the ledger rejects for its content (a constraint or
+# data error) is retried one bet at a time, and the bet at fault, like a row that
+# cannot be decoded, is moved to the dead_letter table so it cannot hold up the
+# bets queued behind it (requeue_dead_letters puts them back).
+
+QUEUE_PATH = os.path.join(os.path.dirname(store.CACHE_DIR), 'bet_queue.sqlite3')
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.5  # seconds between flushes
+RETRY_DELAY = 5  # seconds to wait after a failed flush, doubled on every further failure
+MAX_RETRY_DELAY = 300
+ISOLATE_AFTER = 1  # rejected batches after which bets are flushed one at a time
+ODDS_TOLERANCE = 0.01
+
+class BetRejected(ValueError):
+    pass
+
+def is_rejected(error):
+    """Whether the ledger refused the bets themselves, rather than being unreachable."""
+    if isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError)):
+        return True
+    # Postgres SQLSTATE classes 22 (data exception) and 23 (integrity constraint violation), see postgrest.APIError
+    return str(getattr(error, 'code', None) or '')[:2] in ('22', '23')
+
+class OddsBook:
+    """Current odds of the slate, indexed by game id (see utils.price_games)."""
+
+    def __init__(self, games):
+        self.games = {
+            row['Game ID']: row
+            for row in games[['Game ID', 'Home Team', 'Away Team', 'Home Odds', 'Away Odds', 'Status']].to_dict('records')
+        }
+
+    def validate(self, bet):
+        game = self.games.get(bet['game_id'])
+        if game is None:
+            raise BetRejected("This game is not open for betting.")
+        if game['Status'].startswith('Final'):
+            raise BetRejected("This game is already over.")
+        offered = {game['Home Team']: game['Home Odds'], game['Away Team']: game['Away Odds']}
+        if bet['chosen_team'] not in offered:
+            raise BetRejected(f"{bet['chosen_team']} is not playing in this game.")
+        if abs(bet['odds'] - offered[bet['chosen_team']]) > ODDS_TOLERANCE:
+            raise BetRejected("The odds have changed, please check them and place your bet again.")
+        if bet['stake'] <= 0:
+            raise BetRejected("The stake must be positive.")
+
+class BetQueue:
+    def __init__(self, ledger, path=QUEUE_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.ledger = ledger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.odds = None
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL keeps appends durable without an fsync of the whole database per bet
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("pragma synchronous=normal")
+        self.conn.execute(
+            "create table if not exists queue (seq integer primary key autoincrement, user_id text, bet text, "
+            "attempts integer not null default 0)"
+        )
+        if 'attempts' not in [row[1] for row in self.conn.execute("pragma table_info(queue)")]:
+            self.conn.execute("alter table queue add column attempts integer not null default 0")
+        self.conn.execute(
+            "create table if not exists dead_letter (seq integer primary key, user_id text, bet text, error text)"
+        )
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def update_odds(self, games):
+        self.odds = OddsBook(games)
+
+    def submit(self, bet):
+        """Validate a bet and queue it. Returns its idempotency key."""
+        return self.submit_many([bet])[0]
+
+    def submit_many(self, bets):
+        bets = [dict(bet) for bet in bets]
+        for bet in bets:
+            if self.odds is not None:
+                self.odds.validate(bet)
+            bet.setdefault('idempotency_key', uuid.uuid4().hex)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "insert into queue (user_id, bet) values (?, ?)",
+                [(str(bet['user_id']), json.dumps(bet, default=str)) for bet in bets],
+            )
+        if self.pending() >= self.batch_size:
+            self.wakeup.set()
+        return [bet['idempotency_key'] for bet in bets]
+
+    def pending(self, user_id=None):
+        with self.lock:
+            if user_id is None:
+                return self.conn.execute("select count(*) from queue").fetchone()[0]
+            return self.conn.execute("select count(*) from queue where user_id = ?", (str(user_id),)).fetchone()[0]
+
+    def flush(self):
+        """Write one batch to the ledger. Returns the number of bets flushed."""
+        with self.lock:
+            rows = self.conn.execute(
+                "select seq, bet, attempts from queue order by seq limit ?", (self.batch_size,)
+            ).fetchall()
+        if not rows:
+            return 0
+        if rows[0][2] >= ISOLATE_AFTER:
+            # The batch was rejected: find the bet at fault by flushing one at a time
+            rows = rows[:1]
+        bets = []
+        for seq, bet, _ in rows:
+            try:
+                bets.append(json.loads(bet))
+            except ValueError as e:
+                self.dead_letter(seq, e)
+                return 0
+        try:
+            self.ledger.record_bets(bets)
+        except Exception as e:
+            self.record_failure(rows, e)
+            raise
+        # Only drop bets from the queue once they are stored
+        with self.lock, self.conn:
+            self.conn.execute("delete from queue where seq <= ?", (rows[-1][0],))
+        return len(rows)
+
+    def record_failure(self, rows, error):
+        # Connection and server errors say nothing about the bets: they stay queued as they are
+        if not is_rejected(error):
+            return
+        if len(rows) == 1:
+            self.dead_letter(rows[0][0], error)
+            return
+        with self.lock, self.conn:
+            self.conn.executemany("update queue set attempts = attempts + 1 where seq = ?", [(seq,) for seq, _, _ in rows])
+
+    def dead_letter(self, seq, error):
+        print(f"Moving bet {seq} to the dead letter queue: {error}")
+        with self.lock, self.conn:
+            self.conn.execute(
+                "insert into dead_letter (seq, user_id, bet, error) select seq, user_id, bet, ? from queue "
+                "where seq = ?", (str(error), seq),
+            )
+            self.conn.execute("delete from queue where seq = ?", (seq,))
+
+    def dead_letters(self):
+        with self.lock:
+            return self.conn.execute("select seq, user_id, bet, error from dead_letter order by seq").fetchall()
+
+    def requeue_dead_letters(self):
+        """Put the dead letters back at the head of the queue, e.g. after fixing their cause."""
+        with self.lock, self.conn:
+            self.conn.execute("insert into queue (seq, user_id, bet) select seq, user_id, bet from dead_letter")
+            return self.conn.execute("delete from dead_letter").rowcount
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='bet-queue', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+    def run(self):
+        failures = 0
+        while not self.stopped.is_set():
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception as e:
+                delay = min(RETRY_DELAY * 2 ** failures, MAX_RETRY_DELAY)
+                failures += 1
+                print(f"Failed to flush bets, retrying in {delay} seconds: {e}")
+                self.stopped.wait(delay)
+                continue
+            failures = 0
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_bet_queue(ledger):
+    # One queue (and one flusher thread) per process
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = BetQueue(ledger).start()
+        return _queue
@@ -0,0 +1,215 @@
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from nba_api.stats.static import teams
+from utils import CURRENT_SEASON, calculate_win_probability, get_past_games
+from games_dataset import season_string
+import store
+
+INITIAL_ELO = 1500
+K_FACTOR = 20
+CARRY_OVER = 0.75  # share of last season's rating a team keeps at the start of a new season
+# Final ratings of 2023-24, the seed of 2024-25. Later seasons start from the final
+# state of the season before them; earlier seasons have no seed and no ratings.
+SEED_RATINGS = 'elo-2023-24.csv'
+SEED_SEASON = '2023-24'
+# Game ids are 00<type><season><number>: regular season (2), playoffs (4) and play-in (5)
+# games count; preseason (1) and All-Star (3) exhibitions do not
+RATED_GAME_TYPES = (2, 4, 5)
+STATE_DIR = os.path.join(os.path.dirname(store.CACHE_DIR), 'elo')
+
+def calculate_elo(rating1, rating2, k, score1, score2):
+    """
+    Calculate the new Elo ratings for two teams.
+
+    Works on scalars as well as NumPy arrays of games.
+
+    :param rating1: Current rating of team 1
+    :param rating2: Current rating of team 2
+    :param k: K-factor (usually between 20 and 32)
+    :param score1: Score of team 1
+    :param score2: Score of team 2
+    :return: Tuple of new ratings (rating1, rating2)
+    """
+    expected1 = calculate_win_probability(rating1, rating2)
+    result1 = np.where(score1 > score2, 1.0, np.where(score1 == score2, 0.5, 0.0))
+    change = k * (result1 - expected1)
+    return rating1 + change, rating2 - change
+
+def replay(ratings, home, away, home_score, away_score, days, k=K_FACTOR):
+    """
+    Apply games to a ratings array in place.
+
+    A team plays at most once per day, so every game of a day is independent of
+    the others and the whole day is updated in one array operation.
+
+    :param ratings: Float array of ratings, indexed by team position
+    :param home: Team positions of the home teams, sorted chronologically
+    :param away: Team positions of the away teams
+    :param home_score: Home team scores
+    :param away_score: Away team scores
+    :param days: Day of each game (any sortable value), in the same order
+    :return: Pre-game home win probability of every game
+    """
+    pre_game = np.empty(len(home))
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else []
+    ends = np.r_[starts[1:], len(days)] if len(days) else []
+    for start, end in zip(starts, ends):
+        h, a = home[start:end], away[start:end]
+        pre_game[start:end] = calculate_win_probability(ratings[h], ratings[a])
+        new_home, new_away = calculate_elo(ratings[h], ratings[a], k, home_score[start:end], away_score[start:end])
+        ratings[h] = new_home
+        ratings[a] = new_away
+    return pre_game
+
+def carry_over(previous, team_ids):
+    # Last season's final ratings, regressed towards the mean
+    return np.array([
+        CARRY_OVER * previous.get(team_id, INITIAL_ELO) + (1 - CARRY_OVER) * INITIAL_ELO
+        for team_id in team_ids
+    ], dtype=float)
+
+def seed_ratings(team_ids, path=SEED_RATINGS):
+    nickname_to_id = {team['full_name'].split()[-1]: team['id'] for team in teams.get_teams()}
+    seed = pd.read_csv(path)
+    return carry_over({nickname_to_id.get(name): elo for name, elo in zip(seed['Team'], seed['Elo'])}, team_ids)
+
+def has_seed(season):
+    return store.season_start(season) > store.season_start(SEED_SEASON)
+
+def season_seed(season, team_ids):
+    """
+    Start-of-season ratings, chained from SEED_RATINGS through every season since.
+
+    :return: Tuple (ratings, provisional); provisional when a season along the chain
+        had no games (e.g. its game table could not be fetched), so the seed is redone later
+    """
+    if not has_seed(season):
+        raise ValueError(f"No Elo ratings before {season_string(store.season_start(SEED_SEASON) + 1)}")
+    previous = season_string(store.season_start(season) - 1)
+    if previous == SEED_SEASON:
+        return seed_ratings(team_ids), False
+    engine = get_elo_engine(previous)
+    return carry_over(engine.ratings_by_team(), team_ids), engine.provisional or not engine.applied
+
+class EloEngine:
+    """Season Elo ratings, updated incrementally from the season game table."""
+
+    def __init__(self, season=CURRENT_SEASON, team_ids=None, ratings=None, last_game=None, applied=None):
+        self.season = season
+        self.team_ids = list(team_ids or [team['id'] for team in teams.get_teams()])
+        self.index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        # A provisional seed is never saved, so the season is seeded again once the chain has games
+        self.provisional = False
+        if ratings is not None:
+            self.ratings = np.asarray(ratings, dtype=float)
+        else:
+            self.ratings, self.provisional = season_seed(season, self.team_ids)
+        # (gameDate, gameId) of the last game applied
+        self.last_game = (last_game[0], int(last_game[1])) if last_game else None
+        # Ids of every game applied, so games reported late for an earlier date still count
+        self.applied = set(applied) if applied is not None else None
+
+    def rating(self, team_id):
+        i = self.index.get(int(team_id))
+        return INITIAL_ELO if i is None else float(self.ratings[i])
+
+    def ratings_by_team(self):
+        return dict(zip(self.team_ids, self.ratings.tolist()))
+
+    def update(self, games):
+        """Apply the games not processed yet. Returns the number of new games."""
+        games = games[['gameDate', 'gameId', 'homeTeamId', 'awayTeamId', 'homeTeamScore', 'awayTeamScore']]
+        games = games.assign(
+            gameDate=games['gameDate'].astype(str).str[:10],
+            gameId=pd.to_numeric(games['gameId']).astype('int64'),
+            homeTeamId=games['homeTeamId'].astype('int64'),
+            awayTeamId=games['awayTeamId'].astype('int64'),
+        )
+        games = games[games['homeTeamId'].isin(self.index) & games['awayTeamId'].isin(self.index)
+                      & (games['gameId'] // 10**7).isin(RATED_GAME_TYPES)]
+        if self.applied is None:
+            # State saved before ids were tracked: everything up to its last game was applied
+            self.applied = set()
+            if self.last_game is not None:
+                last_date, last_id = self.last_game
+                seen = (games['gameDate'] < last_date) | ((games['gameDate'] == last_date) & (games['gameId'] <= last_id))
+                self.applied.update(games.loc[seen, 'gameId'].tolist())
+        games = games[~games['gameId'].isin(self.applied)]
+        if games.empty:
+            return 0
+
+        games = games.sort_values(['gameDate', 'gameId'])
+        replay(
+            self.ratings,
+            games['homeTeamId'].map(self.index).to_numpy(),
+            games['awayTeamId'].map(self.index).to_numpy(),
+            games['homeTeamScore'].to_numpy(dtype=float),
+            games['awayTeamScore'].to_numpy(dtype=float),
+            games['gameDate'].to_numpy(),
+        )
+        self.applied.update(games['gameId'].tolist())
+        last = games.iloc[-1]
+        if self.last_game is None or (last['gameDate'], int(last['gameId'])) > self.last_game:
+            self.last_game = (last['gameDate'], int(last['gameId']))
+        return len(games)
+
+    def save(self, path=None):
+        path = path or state_path(self.season)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {
+            'season': self.season,
+            'team_ids': self.team_ids,
+            'ratings': self.ratings.tolist(),
+            'last_game': self.last_game,
+            'applied': sorted(self.applied or ()),
+        }
+        # A temporary file of its own, so concurrent saves of the same season cannot mix
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+            json.dump(state, f)
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, season=CURRENT_SEASON, path=None):
+        try:
+            with open(path or state_path(season)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cls(season)
+        return cls(state['season'], state['team_ids'], state['ratings'], state['last_game'], state.get('applied'))
+
+def state_path(season):
+    return os.path.join(STATE_DIR, f"{season}.json")
+
+def get_elo_engine(season=CURRENT_SEASON):
+    # Resume from the saved state and only apply games played since
+    engine = EloEngine.load(season)
+    # A newly seeded season is saved too, so its seed is not chained again on every call
+    applied = engine.update(get_past_games(season))
+    if not engine.provisional and (applied or not os.path.exists(state_path(season))):
+        engine.save()
+    return engine
+
+if __name__ == "__main__":
+    # Benchmark: full-season replay of 1,230 games (about 165 game days)
+    rng = np.random.default_rng(0)
+    n_games, n_days = 1230, 165
+    # Each day pairs up distinct teams, so no team plays twice on a day (as replay assumes)
+    per_day = np.full(n_days, n_games // n_days)
+    per_day[rng.choice(n_days, n_games % n_days, replace=False)] += 1
+    pairs = [rng.permutation(30)[:2 * n].reshape(n, 2) for n in per_day]
+    days = np.repeat(np.arange(n_days), per_day)
+    home, away = np.concatenate(pairs).T
+    home_score = rng.integers(85, 135, n_games)
+    away_score = rng.integers(85, 135, n_games)
+
+    runs = []
+    for _ in range(5):
+        ratings = np.full(30, float(INITIAL_ELO))
+        start = time.perf_counter()
+        replay(ratings, home, away, home_score, away_score, days)
+        runs.append(time.perf_counter() - start)
+    print(f"Replayed {n_games:,} games in {min(runs) * 1000:.2f} ms (best of {len(runs)})")
@@ -0,0 +1,91 @@
+import difflib
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from nba_api.stats.static import players, teams
+
+# Hash indexes over nba_api's static team and player lists, built once per
+# process and shared by all pages and sessions.
+
+class TeamIndex:
+    def __init__(self, all_teams):
+        self.teams = list(all_teams)
+        self.names = [team['full_name'] for team in self.teams]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.by_id = {team['id']: team for team in self.teams}
+        self.by_full_name = {team['full_name'].lower(): team for team in self.teams}
+        self.by_nickname = {team['nickname'].lower(): team for team in self.teams}
+        # Game tables use the last word of the name ('Blazers' for the Trail Blazers)
+        self.by_nickname.update({team['full_name'].split()[-1].lower(): team for team in self.teams})
+        self.by_abbreviation = {team['abbreviation'].lower(): team for team in self.teams}
+
+    def get(self, key):
+        """Team by id, full name, nickname or abbreviation (case-insensitive), or None."""
+        try:
+            team = self.by_id.get(int(key))
+        except (TypeError, ValueError):
+            team = None
+        if team is None and isinstance(key, str):
+            key = key.lower()
+            team = self.by_full_name.get(key) or self.by_nickname.get(key) or self.by_abbreviation.get(key)
+        return team
+
+def fold(name):
+    # Case- and accent-insensitive form of a name ('Jokić' -> 'jokic')
+    return unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower()
+
+class PlayerIndex:
+    def __init__(self, all_players):
+        self.players = list(all_players)
+        self.by_id = {player['id']: player for player in self.players}
+        self.by_full_name = {}
+        for player in self.players:
+            self.by_full_name.setdefault(fold(player['full_name']), []).append(player)
+        # Sorted (name, id) keys on full and last name for prefix search
+        self.keys = sorted(
+            {(fold(player['full_name']), player['id']) for player in self.players} |
+            {(fold(player['last_name']), player['id']) for player in self.players if player['last_name']}
+        )
+        self.key_names = [name for name, _ in self.keys]
+        self.full_names = list(self.by_full_name)
+        self.active = sorted((player for player in self.players if player['is_active']), key=lambda player: player['full_name'])
+
+    def get(self, player_id):
+        return self.by_id.get(int(player_id))
+
+    def find(self, full_name):
+        """All players with this exact full name (case- and accent-insensitive)."""
+        return self.by_full_name.get(fold(full_name), [])
+
+    def search(self, query, limit=20, active_only=False):
+        """
+        Players whose full or last name starts with query, falling back to close
+        matches on the full name when nothing starts with it.
+        """
+        query = fold(query.strip())
+        if not query:
+            return []
+        matches = {}
+        for i in range(bisect_left(self.key_names, query), len(self.keys)):
+            name, player_id = self.keys[i]
+            if not name.startswith(query):
+                break
+            player = self.by_id[player_id]
+            if not active_only or player['is_active']:
+                matches[player_id] = player
+        if not matches:
+            for name in difflib.get_close_matches(query, self.full_names, n=limit, cutoff=0.7):
+                for player in self.by_full_name[name]:
+                    if not active_only or player['is_active']:
+                        matches[player['id']] = player
+        # Active players first, then alphabetically
+        results = sorted(matches.values(), key=lambda player: (not player['is_active'], player['full_name']))
+        return results[:limit]
+
+@lru_cache(maxsize=None)
+def get_team_index():
+    return TeamIndex(teams.get_teams())
+
+@lru_cache(maxsize=None)
+def get_player_index():
+    return PlayerIndex(players.get_players())
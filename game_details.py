@@ -0,0 +1,352 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.fs
+from requests.exceptions import RequestException
+from games_dataset import format_game_id
+from scheduler import get_scheduler, CircuitOpenError
+from utils import get_past_games, CURRENT_SEASON, MAX_CONCURRENT_REQUESTS
+
+# Per-game detail data: player box scores and play-by-play of every finished
+# game, from the live (cdn.nba.com) endpoints. Stored as uncompressed Arrow IPC
+# (Feather v2) files, which are memory-mapped when read, one directory per season:
+#
+#   <DETAILS_DIR>/season=2024-25/box_scores/part-<time>.arrow
+#   <DETAILS_DIR>/season=2024-25/play_by_play/part-<time>.arrow
+#   <DETAILS_DIR>/season=2024-25/unavailable.json   games without detail data
+#
+# Each ingest run only fetches games not stored yet and appends new part files.
+# Queries read the needed columns of the matching rows only, e.g. player_shots().
+
+DETAILS_DIR = os.environ.get('NBA_DETAILS_DIR', os.path.join('data', 'details'))
+BATCH_GAMES = 100  # games per part file
+KINDS = ('box_scores', 'play_by_play')
+
+BOX_SCORE_STATS = [
+    'points', 'reboundsTotal', 'reboundsOffensive', 'reboundsDefensive', 'assists', 'steals', 'blocks',
+    'turnovers', 'foulsPersonal', 'fieldGoalsMade', 'fieldGoalsAttempted', 'threePointersMade',
+    'threePointersAttempted', 'freeThrowsMade', 'freeThrowsAttempted', 'plusMinusPoints',
+]
+
+BOX_SCORE_SCHEMA = pa.schema(
+    [('gameId', pa.int32()), ('teamId', pa.int32()), ('teamTricode', pa.dictionary(pa.int8(), pa.string())),
+     ('home', pa.bool_()), ('personId', pa.int32()), ('name', pa.string()),
+     ('position', pa.dictionary(pa.int8(), pa.string())), ('starter', pa.bool_()), ('played', pa.bool_()),
+     ('minutes', pa.float32())]
+    + [(stat, pa.int16()) for stat in BOX_SCORE_STATS]
+)
+
+PLAY_BY_PLAY_SCHEMA = pa.schema([
+    ('gameId', pa.int32()), ('actionNumber', pa.int32()), ('period', pa.int8()),
+    ('clock', pa.float32()),  # seconds left in the period
+    ('teamId', pa.int32()), ('personId', pa.int32()),
+    ('actionType', pa.dictionary(pa.int16(), pa.string())), ('subType', pa.dictionary(pa.int16(), pa.string())),
+    ('isFieldGoal', pa.bool_()), ('shotResult', pa.dictionary(pa.int8(), pa.string())),
+    ('shotDistance', pa.float32()), ('x', pa.float32()), ('y', pa.float32()),
+    ('scoreHome', pa.int16()), ('scoreAway', pa.int16()), ('description', pa.string()),
+])
+
+def parse_clock(clock):
+    # ISO 8601 durations such as 'PT11M42.00S' (clock) or 'PT25M01.00S' (minutes played)
+    match = re.match(r'PT(?:(\d+)M)?(?:([\d.]+)S)?', clock or '')
+    if not match:
+        return np.nan
+    return int(match.group(1) or 0) * 60 + float(match.group(2) or 0)
+
+def _as_int(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(0).astype('int64').to_numpy()
+
+def box_score_table(game):
+    """Player box scores of one game (BoxScore().game.get_dict()) in BOX_SCORE_SCHEMA."""
+    players = [
+        (team, home, player)
+        for team, home in ((game['homeTeam'], True), (game['awayTeam'], False))
+        for player in team.get('players', [])
+    ]
+    stats = [player.get('statistics', {}) for _, _, player in players]
+    columns = {
+        'gameId': np.full(len(players), int(game['gameId'])),
+        'teamId': [team['teamId'] for team, _, _ in players],
+        'teamTricode': [team['teamTricode'] for team, _, _ in players],
+        'home': [home for _, home, _ in players],
+        'personId': [player['personId'] for _, _, player in players],
+        'name': [player.get('name') for _, _, player in players],
+        'position': [player.get('position') or None for _, _, player in players],
+        'starter': [player.get('starter') == '1' for _, _, player in players],
+        'played': [player.get('played') == '1' for _, _, player in players],
+        'minutes': [parse_clock(stat.get('minutesCalculated') or stat.get('minutes')) / 60 for stat in stats],
+    }
+    for stat in BOX_SCORE_STATS:
+        columns[stat] = _as_int([row.get(stat) for row in stats])
+    return pa.Table.from_pydict(columns, schema=BOX_SCORE_SCHEMA)
+
+def play_by_play_table(game_id, actions):
+    """Play-by-play actions of one game (PlayByPlay().actions.get_dict()) in PLAY_BY_PLAY_SCHEMA."""
+    def column(key):
+        return [action.get(key) for action in actions]
+
+    return pa.Table.from_pydict({
+        'gameId': np.full(len(actions), int(game_id)),
+        'actionNumber': _as_int(column('actionNumber')),
+        'period': _as_int(column('period')),
+        'clock': [parse_clock(clock) for clock in column('clock')],
+        'teamId': _as_int(column('teamId')),
+        'personId': _as_int(column('personId')),
+        'actionType': column('actionType'),
+        'subType': [value or None for value in column('subType')],
+        'isFieldGoal': [bool(value) for value in column('isFieldGoal')],
+        'shotResult': column('shotResult'),
+        'shotDistance': pd.to_numeric(pd.Series(column('shotDistance'), dtype=object), errors='coerce').to_numpy(),
+        'x': pd.to_numeric(pd.Series(column('xLegacy'), dtype=object), errors='coerce').to_numpy(),
+        'y': pd.to_numeric(pd.Series(column('yLegacy'), dtype=object), errors='coerce').to_numpy(),
+        'scoreHome': _as_int(column('scoreHome')),
+        'scoreAway': _as_int(column('scoreAway')),
+        'description': column('description'),
+    }, schema=PLAY_BY_PLAY_SCHEMA)
+
+class FetchFailed(Exception):
+    """Upstream could not be reached (circuit open, timeout, server error); the game is retried on the next run."""
+
+def fetch_live(endpoint, game_id, attribute):
+    """
+    Payload of a live endpoint for one game through the shared scheduler, or None
+    when the game has none: a 404 (older games are not on the cdn) or a response
+    without the payload.
+
+    Raises FetchFailed when upstream is down or answers with an error, so the game
+    is not taken for one without data.
+    """
+    from nba_api.live.nba.library.http import NBALiveHTTP
+
+    def request():
+        # The endpoints never check the status and fail on decoding any error page, so the
+        # response is requested here and classified by status; only errors count against the breaker
+        live = endpoint(game_id=game_id, timeout=60, get_request=False)
+        live.nba_response = NBALiveHTTP().send_api_request(
+            endpoint=live.endpoint_url.format(game_id=game_id), parameters={}, headers=live.headers, timeout=60,
+        )
+        status = live.nba_response._status_code
+        if status == 404:
+            return None
+        if status != 200:
+            raise FetchFailed(f"{endpoint.__name__} for game {game_id}: HTTP {status}")
+        return live
+
+    try:
+        live = get_scheduler().attempt(request)
+    except (CircuitOpenError, RequestException) as e:
+        raise FetchFailed(f"{endpoint.__name__} for game {game_id}: {e}") from e
+    if live is None:
+        print(f"No {endpoint.__name__} for game {game_id}")
+        return None
+    try:
+        live.load_response()
+    except ValueError as e:
+        raise FetchFailed(f"{endpoint.__name__} for game {game_id}: invalid response ({e})") from e
+    payload = getattr(live, attribute, None)
+    if payload is None:
+        print(f"No {endpoint.__name__} for game {game_id}: empty payload")
+        return None
+    return payload.get_dict()
+
+def fetch_game(game_id, kinds=KINDS):
+    """
+    Tables of one game for each of the kinds asked for, None for a kind the game has no data for.
+
+    Play-by-play is not requested for a game without a box score. Raises FetchFailed.
+    """
+    from nba_api.live.nba.endpoints import boxscore, playbyplay
+
+    def table(build, payload):
+        # A payload without the fields of a finished game counts as no data
+        try:
+            return None if payload is None else build(payload)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Incomplete payload for game {game_id}: {e!r}")
+            return None
+
+    game_id = format_game_id(game_id)
+    tables = {}
+    if 'box_scores' in kinds:
+        tables['box_scores'] = table(box_score_table, fetch_live(boxscore.BoxScore, game_id, 'game'))
+        if tables['box_scores'] is None:
+            return tables
+    if 'play_by_play' in kinds:
+        tables['play_by_play'] = table(partial(play_by_play_table, game_id),
+                                       fetch_live(playbyplay.PlayByPlay, game_id, 'actions'))
+    return tables
+
+def season_dir(season):
+    return os.path.join(DETAILS_DIR, f"season={season}")
+
+def write_part(season, kind, tables):
+    path = os.path.join(season_dir(season), kind)
+    os.makedirs(path, exist_ok=True)
+    name = f"part-{time.time_ns()}.arrow"
+    # Uncompressed, so readers can memory-map the file; datasets skip the dot-prefixed temporary file
+    feather.write_feather(pa.concat_tables(tables), os.path.join(path, '.' + name), compression='uncompressed')
+    os.replace(os.path.join(path, '.' + name), os.path.join(path, name))
+
+def dataset(season, kind):
+    path = os.path.join(season_dir(season), kind)
+    if not os.path.isdir(path) or not os.listdir(path):
+        return None
+    return ds.dataset(path, format='ipc', filesystem=pa.fs.LocalFileSystem(use_mmap=True))
+
+def read(season, kind='box_scores', columns=None, filter=None):
+    """Rows of a season's detail data as a DataFrame, reading only the columns and rows asked for."""
+    data = dataset(season, kind)
+    schema = BOX_SCORE_SCHEMA if kind == 'box_scores' else PLAY_BY_PLAY_SCHEMA
+    if data is None:
+        return schema.empty_table().select(columns or schema.names).to_pandas()
+    return data.to_table(columns=columns, filter=filter).to_pandas()
+
+def stored_games(season, kind='box_scores'):
+    data = dataset(season, kind)
+    if data is None:
+        return set()
+    return set(data.to_table(columns=['gameId'])['gameId'].unique().to_pylist())
+
+def _unavailable_path(season):
+    return os.path.join(season_dir(season), 'unavailable.json')
+
+def _read_unavailable(season):
+    try:
+        with open(_unavailable_path(season)) as f:
+            unavailable = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Older files hold a plain list of the games without a box score
+    return {'box_scores': unavailable} if isinstance(unavailable, list) else unavailable
+
+def unavailable_games(season, kind='box_scores'):
+    """Games the cdn had no data of the kind for on an earlier run."""
+    return set(_read_unavailable(season).get(kind, []))
+
+def ingest_season(season=CURRENT_SEASON, play_by_play=True, max_workers=MAX_CONCURRENT_REQUESTS,
+                  batch_games=BATCH_GAMES, limit=None, retry_unavailable=False):
+    """
+    Fetch the details of the season's finished games not stored yet.
+
+    Requests run on at most max_workers threads (and the shared rate limit); every
+    batch_games games are written as a new part, so an interrupted run resumes
+    where it stopped. Each kind is tracked on its own: a game whose play-by-play
+    failed is fetched again for that alone. Games upstream failed on are left for
+    the next run rather than marked unavailable. Returns the number of games stored.
+    """
+    kinds = KINDS if play_by_play else ('box_scores',)
+    for kind in kinds:
+        _finish_compaction(season, kind)
+    known = _read_unavailable(season)
+    done = {kind: stored_games(season, kind) for kind in kinds}
+    skip = {kind: set() if retry_unavailable else set(known.get(kind, [])) for kind in kinds}
+    todo = []
+    for game_id in get_past_games(season)['gameId'].tolist():
+        if game_id in skip['box_scores']:
+            continue
+        wanted = tuple(kind for kind in kinds if game_id not in done[kind] and game_id not in skip[kind])
+        if wanted:
+            todo.append((game_id, wanted))
+    todo = todo[:limit] if limit else todo
+    missing = {kind: set(known.get(kind, [])) - {game_id for game_id, wanted in todo if kind in wanted}
+               for kind in set(known) | set(kinds)}
+    stored = 0
+
+    def fetch(item):
+        game_id, wanted = item
+        try:
+            return fetch_game(game_id, wanted)
+        except FetchFailed as e:
+            print(f"Skipping game {game_id} until the next run: {e}")
+            return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for start in range(0, len(todo), batch_games):
+            batch = todo[start:start + batch_games]
+            results = list(executor.map(fetch, batch))
+            for kind in kinds:
+                tables = [tables[kind] for tables in results if tables.get(kind) is not None]
+                if tables:
+                    write_part(season, kind, tables)
+                missing[kind] |= {game_id for (game_id, _), tables in zip(batch, results)
+                                  if kind in tables and tables[kind] is None}
+            stored += sum(1 for tables in results if any(table is not None for table in tables.values()))
+            os.makedirs(season_dir(season), exist_ok=True)
+            with open(_unavailable_path(season), 'w') as f:
+                json.dump({kind: sorted(games) for kind, games in missing.items()}, f)
+    return stored
+
+def _compaction_path(season, kind):
+    # Next to the dataset directory rather than in it, so its rows are never read twice
+    return os.path.join(season_dir(season), f".compact-{kind}.arrow")
+
+def _finish_compaction(season, kind):
+    """Delete the parts a compaction merged, then move the merged file in; safe to repeat after a crash."""
+    pending = _compaction_path(season, kind)
+    if not os.path.exists(pending):
+        return
+    with open(pending + '.json') as f:
+        merged = json.load(f)
+    for name in merged:
+        if os.path.exists(name):
+            os.remove(name)
+    os.replace(pending, os.path.join(season_dir(season), kind, f"part-{time.time_ns()}.arrow"))
+    os.remove(pending + '.json')
+
+def compact(season, kind):
+    """Merge a season's part files into one (fewer files to open per query)."""
+    _finish_compaction(season, kind)
+    data = dataset(season, kind)
+    if data is None or len(data.files) < 2:
+        return
+    pending = _compaction_path(season, kind)
+    feather.write_feather(data.to_table(), pending + '.tmp', compression='uncompressed')
+    # The list of merged parts goes first: once the merged file exists, it says what to delete
+    with open(pending + '.json', 'w') as f:
+        json.dump(list(data.files), f)
+    os.replace(pending + '.tmp', pending)
+    _finish_compaction(season, kind)
+
+def player_shots(player_id, season=CURRENT_SEASON, columns=('gameId', 'period', 'clock', 'actionType', 'subType',
+                                                             'shotResult', 'shotDistance', 'x', 'y')):
+    """Every field goal attempt of a player in the season (shot chart data)."""
+    return read(season, 'play_by_play', list(columns),
+                (ds.field('personId') == int(player_id)) & ds.field('isFieldGoal'))
+
+def player_box_scores(player_id, season=CURRENT_SEASON):
+    return read(season, 'box_scores', filter=ds.field('personId') == int(player_id))
+
+def game_box_score(game_id, season):
+    return read(season, 'box_scores', filter=ds.field('gameId') == int(game_id))
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest box scores and play-by-play of finished games.")
+    parser.add_argument('seasons', nargs='*', default=[CURRENT_SEASON], help="Seasons such as 2024-25 (default: current)")
+    parser.add_argument('--no-play-by-play', action='store_true', help="Only box scores")
+    parser.add_argument('--workers', type=int, default=MAX_CONCURRENT_REQUESTS, help="Concurrent requests")
+    parser.add_argument('--limit', type=int, help="At most this many new games per season")
+    parser.add_argument('--retry-unavailable', action='store_true', help="Retry games that had no detail data")
+    parser.add_argument('--compact', action='store_true', help="Merge each season's part files afterwards")
+    args = parser.parse_args()
+
+    for season in args.seasons:
+        start = time.perf_counter()
+        stored = ingest_season(season, not args.no_play_by_play, args.workers,
+                               limit=args.limit, retry_unavailable=args.retry_unavailable)
+        if args.compact:
+            compact(season, 'box_scores')
+            compact(season, 'play_by_play')
+        print(f"{season}: {stored} new games in {time.perf_counter() - start:.1f} s, "
+              f"{len(stored_games(season))} stored, {len(unavailable_games(season))} unavailable")
+
+if __name__ == "__main__":
+    main()
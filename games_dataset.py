@@ -0,0 +1,159 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+import store
+
+# Local dataset of normalized game tables (README V0.6 format), one Parquet
+# partition per season: <DATA_DIR>/season=2005-06/games.parquet
+
+DATA_DIR = os.environ.get('NBA_DATA_DIR', os.path.join('data', 'games'))
+FIRST_SEASON = 1990  # earliest season offered by the season selectors
+
+# V0.6 game table format shared by live and past games
+GAME_TABLE_COLUMNS = [
+    'gameId', 'gameStatusText', 'gameDate',
+    'homeTeamId', 'homeTeamName', 'homeTeamScore',
+    'awayTeamId', 'awayTeamName', 'awayTeamScore',
+    'winningTeam'
+]
+
+# Compact in-memory and on-disk types of past game tables
+GAME_TABLE_DTYPES = {
+    'gameId': 'int32',  # '0022400095' -> 22400095, see format_game_id
+    'gameStatusText': 'category',
+    'gameDate': 'datetime64[ns]',
+    'homeTeamId': 'category',
+    'homeTeamName': 'category',
+    'homeTeamScore': 'int16',
+    'awayTeamId': 'category',
+    'awayTeamName': 'category',
+    'awayTeamScore': 'int16',
+    'winningTeam': 'category',
+}
+
+def compact_game_table(games):
+    """Typed copy of a game table, sorted by date so date filters are binary searches."""
+    games = games[GAME_TABLE_COLUMNS]
+    games = games.assign(
+        gameId=pd.to_numeric(games['gameId']),
+        gameDate=pd.to_datetime(games['gameDate'].astype(str).str[:10]),
+    ).astype(GAME_TABLE_DTYPES)
+    return games.sort_values(['gameDate', 'gameId'], ignore_index=True)
+
+def format_game_id(game_id):
+    return f"{int(game_id):010d}"
+
+def expand_game_table(games):
+    # Back to the plain V0.6 format (string ids and dates), for display
+    return games.assign(
+        gameId=[format_game_id(game_id) for game_id in games['gameId']],
+        gameDate=games['gameDate'].dt.strftime('%Y-%m-%d'),
+    ).astype({column: object for column in GAME_TABLE_COLUMNS if GAME_TABLE_DTYPES[column] == 'category'})
+
+def season_string(start_year):
+    return f"{start_year}-{str(start_year + 1)[-2:]}"
+
+def current_season():
+    return season_string(store.current_season_start())
+
+def season_for_date(day):
+    # Games from October onwards belong to the season starting that year
+    return season_string(day.year if day.month >= 10 else day.year - 1)
+
+def season_range(first=FIRST_SEASON, last=None):
+    last = store.current_season_start() if last is None else last
+    return [season_string(year) for year in range(first, last + 1)]
+
+def is_finished(season):
+    return store.season_start(season) < store.current_season_start()
+
+def partition_path(season):
+    return os.path.join(DATA_DIR, f"season={season}", 'games.parquet')
+
+def read_partition(season):
+    try:
+        return compact_game_table(pd.read_parquet(partition_path(season)))
+    except (OSError, ValueError):
+        return None
+
+def write_partition(season, games):
+    path = partition_path(season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    games.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+def seasons_stored():
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(name.split('=', 1)[1] for name in os.listdir(DATA_DIR)
+                  if name.startswith('season=') and os.path.exists(os.path.join(DATA_DIR, name, 'games.parquet')))
+
+def random_game_table(n_games, seed=0):
+    # Synthetic V0.6 game table with the same shapes as LeagueGameFinder results
+    rng = np.random.default_rng(seed)
+    nicknames = np.array(['Hawks', 'Celtics', 'Nets', 'Hornets', 'Bulls', 'Cavaliers', 'Mavericks', 'Nuggets',
+                          'Pistons', 'Warriors', 'Rockets', 'Pacers', 'Clippers', 'Lakers', 'Grizzlies', 'Heat',
+                          'Bucks', 'Timberwolves', 'Pelicans', 'Knicks', 'Thunder', 'Magic', '76ers', 'Suns',
+                          'Blazers', 'Kings', 'Spurs', 'Raptors', 'Jazz', 'Wizards'], dtype=object)
+    home = rng.integers(0, 30, n_games)
+    away = (home + rng.integers(1, 30, n_games)) % 30
+    home_score = rng.integers(80, 140, n_games)
+    away_score = rng.integers(80, 140, n_games)
+    days = pd.Timestamp('1990-11-01') + pd.to_timedelta(np.sort(rng.integers(0, 365 * 35, n_games)), unit='D')
+    return pd.DataFrame({
+        'gameId': [f"{i:010d}" for i in range(20000000, 20000000 + n_games)],
+        'gameStatusText': 'Final',
+        'gameDate': days.strftime('%Y-%m-%d'),
+        'homeTeamId': 1610612737 + home,
+        'homeTeamName': nicknames[home],
+        'homeTeamScore': home_score,
+        'awayTeamId': 1610612737 + away,
+        'awayTeamName': nicknames[away],
+        'awayTeamScore': away_score,
+        'winningTeam': np.where(home_score > away_score, nicknames[home], nicknames[away]),
+    })
+
+def benchmark(n_games):
+    plain = random_game_table(n_games)
+    compact = compact_game_table(plain)
+    days = pd.to_datetime(plain['gameDate'].sample(200, random_state=0)).dt.date
+
+    def timed(lookup):
+        start = time.perf_counter()
+        for day in days:
+            lookup(day)
+        return (time.perf_counter() - start) / len(days) * 1e6
+
+    dates = compact['gameDate'].to_numpy()
+    plain_us = timed(lambda day: plain[plain['gameDate'].str.startswith(day.strftime('%Y-%m-%d'))])
+    compact_us = timed(lambda day: compact.iloc[
+        dates.searchsorted(np.datetime64(day), 'left'):dates.searchsorted(np.datetime64(day) + 1, 'left')
+    ])
+    plain_mb = plain.memory_usage(deep=True).sum() / 1e6
+    compact_mb = compact.memory_usage(deep=True).sum() / 1e6
+    print(f"{n_games:,} games")
+    print(f"  object frame:  {plain_mb:8.1f} MB, date filter {plain_us:10.1f} us")
+    print(f"  compact frame: {compact_mb:8.1f} MB, date filter {compact_us:10.1f} us")
+
+def main():
+    from utils import ingest_seasons
+
+    parser = argparse.ArgumentParser(description="Download game tables into the local season dataset.")
+    parser.add_argument('--first', type=int, default=FIRST_SEASON, help="First season start year")
+    parser.add_argument('--last', type=int, default=None, help="Last season start year (default: current season)")
+    parser.add_argument('--benchmark', type=int, metavar='GAMES',
+                        help="Compare memory and date-filter latency of the object and compact tables instead")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+
+    counts = ingest_seasons(season_range(args.first, args.last))
+    for season, count in counts.items():
+        print(f"{season}: {count} games")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import os
+import time
+from functools import lru_cache
+import pandas as pd
+from utils import fetch_data, CURRENT_SEASON
+from player_stats import PlayerPerformance, fetch_league_game_log, prepare_game_log, season_splits
+
+# League-wide leaderboards, precomputed offline from two bulk LeagueGameLog
+# requests (every player and every team game of the season) and the season Elo
+# state (seasons with an Elo seed only, see elo.has_seed), and stored as one small
+# Parquet snapshot per season:
+# <LEADERBOARD_DIR>/season=2024-25/leaderboards.parquet
+#
+# Run `python leaderboards.py` (e.g. from cron) to refresh the current season.
+
+LEADERBOARD_DIR = os.environ.get('NBA_LEADERBOARD_DIR', os.path.join('data', 'leaderboards'))
+TOP = 50
+MIN_GAMES_SHARE = 0.5  # players qualify with at least this share of the most games played
+
+# board name -> (entity, column of the per-entity table)
+BOARDS = {
+    'Points': ('player', 'PTS'),
+    'Rebounds': ('player', 'REB'),
+    'Assists': ('player', 'AST'),
+    'Plus-Minus': ('player', 'PLUS_MINUS'),
+    'Home Points': ('player', 'PTS_HOME'),
+    'Away Points': ('player', 'PTS_AWAY'),
+    'Team Points': ('team', 'PTS'),
+    'Team Rebounds': ('team', 'REB'),
+    'Team Assists': ('team', 'AST'),
+    'Team Plus-Minus': ('team', 'PLUS_MINUS'),
+    'Win %': ('team', 'WIN_PCT'),
+    'Elo': ('team', 'ELO'),
+}
+
+SNAPSHOT_DTYPES = {
+    'board': 'category',
+    'entity': 'category',
+    'rank': 'int16',
+    'id': 'int32',
+    'name': 'category',
+    'games': 'int16',
+    'value': 'float32',
+}
+
+def player_table(player_log):
+    """Per-game averages (overall, at home and away) of every player who qualifies for the leaderboards."""
+    performance = PlayerPerformance()
+    performance.update(player_log)
+    players = performance.summary(stats=('PTS', 'REB', 'AST', 'PLUS_MINUS'))
+    points = season_splits(prepare_game_log(player_log))['PTS']
+    players = players.join(points.reindex(columns=[True, False]).set_axis(['PTS_HOME', 'PTS_AWAY'], axis=1))
+    players = players[players['GP'] >= MIN_GAMES_SHARE * players['GP'].max()]
+    return players.rename(columns={'PLAYER_NAME': 'NAME'})
+
+def team_table(team_log, elo_ratings=None):
+    """Per-game averages, win percentage and Elo rating of every team."""
+    grouped = team_log.groupby('TEAM_ID')
+    teams = grouped[['PTS', 'REB', 'AST', 'PLUS_MINUS']].mean().astype(float)
+    teams['GP'] = grouped.size()
+    teams['WIN_PCT'] = grouped['WL'].agg(lambda wl: (wl == 'W').mean())
+    teams['NAME'] = grouped['TEAM_NAME'].last()
+    if elo_ratings:
+        teams['ELO'] = pd.Series(elo_ratings, dtype=float).reindex(teams.index)
+    return teams
+
+def build_leaderboards(players, teams, top=TOP):
+    """Long table of the top entries of every board, in the compact snapshot schema."""
+    boards = []
+    for board, (entity, column) in BOARDS.items():
+        table = players if entity == 'player' else teams
+        if column not in table:
+            continue
+        leaders = table[table[column].notna()].nlargest(top, column)
+        boards.append(pd.DataFrame({
+            'board': board,
+            'entity': entity,
+            'rank': range(1, len(leaders) + 1),
+            'id': leaders.index.to_numpy(dtype='int64'),
+            'name': leaders['NAME'].to_numpy(),
+            'games': leaders['GP'].to_numpy(),
+            'value': leaders[column].to_numpy(),
+        }))
+    if not boards:
+        return pd.DataFrame(columns=list(SNAPSHOT_DTYPES)).astype(SNAPSHOT_DTYPES)
+    return pd.concat(boards, ignore_index=True).astype(SNAPSHOT_DTYPES)
+
+def snapshot_path(season):
+    return os.path.join(LEADERBOARD_DIR, f"season={season}", 'leaderboards.parquet')
+
+def write_snapshot(season, leaderboards):
+    path = snapshot_path(season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    leaderboards.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+
+@lru_cache(maxsize=8)
+def _read_snapshot(path, mtime):
+    # Keyed by modification time, so a new snapshot from the job is picked up
+    return pd.read_parquet(path).astype(SNAPSHOT_DTYPES)
+
+def load_leaderboards(season=CURRENT_SEASON):
+    """The season's leaderboard snapshot, or None if the job has not run yet."""
+    path = snapshot_path(season)
+    try:
+        return _read_snapshot(path, os.path.getmtime(path))
+    except (OSError, ValueError):
+        return None
+
+def leaderboard(leaderboards, board, top=10):
+    rows = leaderboards[leaderboards['board'] == board].head(top)
+    return rows[['rank', 'name', 'games', 'value']].astype({'name': object})
+
+def precompute(season=CURRENT_SEASON, top=TOP):
+    """Fetch the season's bulk stats, build its leaderboards and write the snapshot."""
+    from nba_api.stats.endpoints import leaguegamelog
+    from elo import get_elo_engine, has_seed
+
+    player_log = fetch_league_game_log(season)
+    team_log = fetch_data(leaguegamelog.LeagueGameLog, player_or_team_abbreviation='T', season=season)
+    if player_log is None or team_log is None or player_log.empty or team_log.empty:
+        return None
+    # Seasons before the Elo seed have no ratings, and no Elo board
+    elo_ratings = get_elo_engine(season).ratings_by_team() if has_seed(season) else None
+    leaderboards = build_leaderboards(player_table(player_log), team_table(team_log, elo_ratings), top)
+    write_snapshot(season, leaderboards)
+    return leaderboards
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute league leaderboards into local snapshots.")
+    parser.add_argument('seasons', nargs='*', default=[CURRENT_SEASON], help="Seasons such as 2024-25 (default: current)")
+    parser.add_argument('--top', type=int, default=TOP, help="Entries kept per board")
+    args = parser.parse_args()
+
+    for season in args.seasons:
+        start = time.perf_counter()
+        leaderboards = precompute(season, args.top)
+        if leaderboards is None:
+            print(f"{season}: no data, snapshot not written")
+            continue
+        print(f"{season}: {leaderboards['board'].nunique()} boards, {len(leaderboards)} rows "
+              f"in {time.perf_counter() - start:.1f} s -> {snapshot_path(season)}")
+
+if __name__ == "__main__":
+    main()
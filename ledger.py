@@ -0,0 +1,277 @@
+import sqlite3
+import threading
+import pandas as pd
+import metrics
+from settlement import settle_bets
+
+# Bet ledger: pages through a user's bets with keyset pagination, reads only the
+# columns it needs, and keeps per-user running totals so the ROI metrics are a
+# single-row read.
+#
+# Schema expected in Supabase (PostgreSQL), on top of the existing bets table:
+#
+#   alter table bets add column if not exists result text;             -- null while pending
+#   alter table bets add column if not exists actual_payout double precision;
+#   alter table bets add column if not exists idempotency_key text unique;   -- see bet_queue.py
+#   create table if not exists bet_totals (
+#       user_id uuid primary key,
+#       total_stake double precision not null default 0,
+#       total_payout double precision not null default 0,
+#       bet_count integer not null default 0,
+#       settled_count integer not null default 0
+#   );
+#
+# Totals only change inside the database, so concurrent sessions never lose an
+# increment. A user's first update creates their row from all of their bets
+# (users whose bets predate bet_totals), later ones add the delta:
+#
+#   create or replace function add_bet_totals(
+#       p_user_id uuid, p_total_stake double precision default 0, p_total_payout double precision default 0,
+#       p_bet_count integer default 0, p_settled_count integer default 0
+#   ) returns void language sql as $$
+#       insert into bet_totals (user_id, total_stake, total_payout, bet_count, settled_count)
+#       select p_user_id, coalesce(sum(stake), 0), coalesce(sum(actual_payout), 0), count(*), count(result)
+#       from bets where user_id = p_user_id
+#       on conflict (user_id) do update set
+#           total_stake = bet_totals.total_stake + p_total_stake,
+#           total_payout = bet_totals.total_payout + p_total_payout,
+#           bet_count = bet_totals.bet_count + p_bet_count,
+#           settled_count = bet_totals.settled_count + p_settled_count;
+#   $$;
+#
+# Results are stored in one call, only on bets that are still pending, and the
+# payouts of the bets actually settled are added in the same transaction:
+#
+#   create or replace function settle_bet_results(p_user_id uuid, p_results jsonb)
+#   returns integer language plpgsql as $$
+#   declare settled integer; payout double precision;
+#   begin
+#       with updated as (
+#           update bets set result = r.result, actual_payout = r.actual_payout
+#           from jsonb_to_recordset(p_results) as r(id bigint, result text, actual_payout double precision)
+#           where bets.id = r.id and bets.user_id = p_user_id and bets.result is null
+#           returning bets.actual_payout
+#       )
+#       select count(*), coalesce(sum(actual_payout), 0) into settled, payout from updated;
+#       if settled > 0 then
+#           perform add_bet_totals(p_user_id, p_total_payout => payout, p_settled_count => settled);
+#       end if;
+#       return settled;
+#   end $$;
+#
+# New bets and their stakes are recorded together as well, so a retried batch
+# (see bet_queue.py) can never find its bets stored but their stakes not counted:
+#
+#   create or replace function record_bets(p_bets jsonb)
+#   returns integer language plpgsql as $$
+#   declare totals jsonb;
+#   begin
+#       with inserted as (
+#           insert into bets (user_id, date, game_id, home_team, away_team, chosen_team, odds, stake, payout,
+#                             idempotency_key)
+#           select user_id, date, game_id, home_team, away_team, chosen_team, odds, stake, payout, idempotency_key
+#           from jsonb_populate_recordset(null::bets, p_bets)
+#           on conflict (idempotency_key) do nothing
+#           returning user_id, stake
+#       )
+#       select coalesce(jsonb_agg(t), '[]') into totals
+#       from (select user_id, sum(stake) as stake, count(*) as bets from inserted group by user_id) t;
+#       perform add_bet_totals((t->>'user_id')::uuid, p_total_stake => (t->>'stake')::double precision,
+#                              p_bet_count => (t->>'bets')::integer)
+#       from jsonb_array_elements(totals) t;
+#       return (select coalesce(sum((t->>'bets')::integer), 0) from jsonb_array_elements(totals) t);
+#   end $$;
+
+PAGE_SIZE = 500
+
+HISTORY_COLUMNS = ['id', 'date', 'home_team', 'away_team', 'chosen_team', 'odds', 'stake', 'result', 'actual_payout']
+SETTLEMENT_COLUMNS = ['id', 'game_id', 'home_team', 'away_team', 'chosen_team', 'odds', 'stake']
+TOTAL_COLUMNS = ['total_stake', 'total_payout', 'bet_count', 'settled_count']
+
+class SupabaseBackend:
+    def __init__(self, client):
+        self.client = client
+
+    @metrics.timed('nba_db_query_seconds', backend='supabase', query='fetch_page')
+    def fetch_page(self, user_id, columns, after_id, limit, pending_only=False):
+        query = self.client.table("bets").select(",".join(columns)).eq("user_id", user_id).gt("id", after_id)
+        if pending_only:
+            query = query.is_("result", "null")
+        return query.order("id").limit(limit).execute().data
+
+    @metrics.timed('nba_db_query_seconds', backend='supabase', query='insert_bets')
+    def insert_bets(self, bets):
+        # Bets already stored under the same idempotency key are skipped; returns the number inserted
+        if not bets:
+            return 0
+        return self.client.rpc("record_bets", {'p_bets': bets}).execute().data
+
+    @metrics.timed('nba_db_query_seconds', backend='supabase', query='update_results')
+    def update_results(self, user_id, results):
+        # One call for the whole batch (see settle_bet_results above)
+        return self.client.rpc("settle_bet_results", {'p_user_id': user_id, 'p_results': results}).execute().data
+
+    @metrics.timed('nba_db_query_seconds', backend='supabase', query='get_totals')
+    def get_totals(self, user_id):
+        rows = self.client.table("bet_totals").select(",".join(TOTAL_COLUMNS)).eq("user_id", user_id).execute().data
+        return rows[0] if rows else None
+
+    @metrics.timed('nba_db_query_seconds', backend='supabase', query='add_totals')
+    def add_totals(self, user_id, **delta):
+        self.client.rpc("add_bet_totals", dict({f"p_{column}": value for column, value in delta.items()},
+                                               p_user_id=user_id)).execute()
+
+class SQLiteBackend:
+    """Local stand-in for the Supabase tables, using PostgreSQL-compatible SQL."""
+
+    def __init__(self, path=':memory:'):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # The connection is shared by threads; writes run one transaction at a time
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            create table if not exists bets (
+                id integer primary key autoincrement,
+                user_id text not null,
+                date text,
+                game_id text,
+                home_team text,
+                away_team text,
+                chosen_team text,
+                odds double precision,
+                stake double precision,
+                payout double precision,
+                result text,
+                actual_payout double precision,
+                idempotency_key text unique
+            );
+            create index if not exists bets_user_id on bets (user_id, id);
+            create table if not exists bet_totals (
+                user_id text primary key,
+                total_stake double precision not null default 0,
+                total_payout double precision not null default 0,
+                bet_count integer not null default 0,
+                settled_count integer not null default 0
+            );
+        """)
+
+    @metrics.timed('nba_db_query_seconds', backend='sqlite', query='fetch_page')
+    def fetch_page(self, user_id, columns, after_id, limit, pending_only=False):
+        sql = f"select {', '.join(columns)} from bets where user_id = ? and id > ?"
+        if pending_only:
+            sql += " and result is null"
+        rows = self.conn.execute(sql + " order by id limit ?", (user_id, after_id, limit))
+        return [dict(row) for row in rows]
+
+    @metrics.timed('nba_db_query_seconds', backend='sqlite', query='insert_bets')
+    def insert_bets(self, bets):
+        if not bets:
+            return 0
+        columns = list(bets[0])
+        sql = (f"insert into bets ({', '.join(columns)}) values ({', '.join('?' * len(columns))}) "
+               f"on conflict do nothing returning user_id, stake")
+        # Bets and their stakes are committed together (see record_bets above)
+        with self.lock, self.conn:
+            inserted = [self.conn.execute(sql, tuple(bet[column] for column in columns)).fetchone() for bet in bets]
+            inserted = [dict(row) for row in inserted if row is not None]
+            if inserted:
+                placed = pd.DataFrame(inserted).groupby('user_id')['stake'].agg(['sum', 'count'])
+                for user_id, row in placed.iterrows():
+                    self._add_totals(user_id, total_stake=float(row['sum']), bet_count=int(row['count']))
+        return len(inserted)
+
+    @metrics.timed('nba_db_query_seconds', backend='sqlite', query='update_results')
+    def update_results(self, user_id, results):
+        with self.lock, self.conn:
+            # Bets settled by a concurrent caller are left alone and not counted again
+            updated = [
+                self.conn.execute(
+                    "update bets set result = ?, actual_payout = ? where id = ? and user_id = ? and result is null "
+                    "returning actual_payout",
+                    (row['result'], row['actual_payout'], row['id'], user_id),
+                ).fetchone()
+                for row in results
+            ]
+            payouts = [row['actual_payout'] for row in updated if row is not None]
+            if payouts:
+                self._add_totals(user_id, total_payout=float(sum(payouts)), settled_count=len(payouts))
+        return len(payouts)
+
+    @metrics.timed('nba_db_query_seconds', backend='sqlite', query='get_totals')
+    def get_totals(self, user_id):
+        row = self.conn.execute(
+            f"select {', '.join(TOTAL_COLUMNS)} from bet_totals where user_id = ?", (user_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    @metrics.timed('nba_db_query_seconds', backend='sqlite', query='add_totals')
+    def add_totals(self, user_id, **delta):
+        with self.lock, self.conn:
+            self._add_totals(user_id, **delta)
+
+    def _add_totals(self, user_id, **delta):
+        # Same statement as add_bet_totals: a missing row is created from all of the user's bets
+        delta = dict(dict.fromkeys(TOTAL_COLUMNS, 0), **delta)
+        self.conn.execute(
+            f"insert into bet_totals (user_id, {', '.join(TOTAL_COLUMNS)}) "
+            f"select ?, coalesce(sum(stake), 0), coalesce(sum(actual_payout), 0), count(*), count(result) "
+            f"from bets where user_id = ? "
+            f"on conflict (user_id) do update set " + ", ".join(f"{c} = bet_totals.{c} + ?" for c in TOTAL_COLUMNS),
+            (user_id, user_id, *(delta[c] for c in TOTAL_COLUMNS)),
+        )
+
+class BetLedger:
+    def __init__(self, backend, page_size=PAGE_SIZE):
+        self.backend = backend
+        self.page_size = page_size
+
+    def pages(self, user_id, columns, pending_only=False):
+        # Keyset pagination: each page starts after the last id of the previous one
+        columns = columns if 'id' in columns else ['id'] + columns
+        after_id = 0
+        while True:
+            rows = self.backend.fetch_page(user_id, columns, after_id, self.page_size, pending_only)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < self.page_size:
+                return
+            after_id = rows[-1]['id']
+
+    def history(self, user_id, columns=HISTORY_COLUMNS, pending_only=False):
+        rows = [row for page in self.pages(user_id, columns, pending_only) for row in page]
+        return pd.DataFrame(rows, columns=columns)
+
+    def record_bets(self, bets):
+        """
+        Insert new bets and add their stakes to each user's running totals.
+
+        Bets carrying an idempotency_key that is already stored are skipped, so
+        retrying a batch never counts a bet twice. The bets and their stakes are
+        written in one transaction. Returns the number inserted.
+        """
+        return self.backend.insert_bets(bets)
+
+    def settle(self, user_id, games):
+        """Settle the user's pending bets whose games are finished. Returns the number settled."""
+        pending = self.history(user_id, SETTLEMENT_COLUMNS, pending_only=True)
+        if pending.empty:
+            return 0
+        settled = settle_bets(pending, games)
+        settled = settled[settled['result'] != 'Pending']
+        if settled.empty:
+            return 0
+        # Only bets still pending are updated, and only their payouts reach the totals
+        return self.backend.update_results(user_id, settled[['id', 'result', 'actual_payout']].to_dict('records'))
+
+    def rebuild_totals(self, user_id):
+        # Totals for users whose bets predate the bet_totals table, built by the database from their bets
+        self.backend.add_totals(user_id)
+        return self.backend.get_totals(user_id)
+
+    def totals(self, user_id):
+        """Running totals of the user with net profit and ROI (in %)."""
+        totals = self.backend.get_totals(user_id) or self.rebuild_totals(user_id)
+        net_profit = totals['total_payout'] - totals['total_stake']
+        roi = net_profit / totals['total_stake'] * 100 if totals['total_stake'] else 0.0
+        return dict(totals, net_profit=net_profit, roi=roi)
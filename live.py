@@ -0,0 +1,143 @@
+import threading
+import time
+import pandas as pd
+from utils import GAME_TABLE_COLUMNS, get_live_games, price_games
+
+# One background poller per process fetches the live scoreboard and keeps the
+# latest snapshot in memory, so pages read it instead of each session polling upstream.
+# Every poll also reprices the whole slate from the new scores and clocks, so
+# in-play odds follow the games without any per-session work.
+
+POLL_INTERVAL = 30  # seconds
+FIRST_SNAPSHOT_TIMEOUT = 15  # seconds a page waits for the very first poll
+RATINGS_TTL = 600  # seconds the Elo ratings used for pricing are reused between polls
+
+# A game counts as changed when any of these differ from the previous snapshot
+WATCHED_COLUMNS = ['gameStatusText', 'homeTeamScore', 'awayTeamScore']
+
+def current_ratings():
+    from elo import get_elo_engine
+    return get_elo_engine().ratings_by_team()
+
+def diff_games(previous, current):
+    """Rows of current that are new or whose score or status changed since previous."""
+    if previous.empty:
+        return current
+    merged = current.merge(
+        previous[['gameId'] + WATCHED_COLUMNS], on='gameId', how='left', suffixes=('', '_previous'), indicator=True
+    )
+    changed = merged['_merge'] == 'left_only'
+    for column in WATCHED_COLUMNS:
+        changed |= merged[column] != merged[column + '_previous']
+    return current[changed.to_numpy()]
+
+class ScoreboardPoller:
+    def __init__(self, interval=POLL_INTERVAL, fetch=get_live_games, ratings=current_ratings):
+        self.interval = interval
+        self.fetch = fetch
+        self.ratings = ratings
+        self.cached_ratings = {}
+        self.ratings_at = None
+        self.snapshot = pd.DataFrame(columns=GAME_TABLE_COLUMNS)
+        self.odds = price_games(self.snapshot, {})
+        self.updated_at = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.first_snapshot = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='scoreboard-poller', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.poll()
+            self.stopped.wait(self.interval)
+
+    def current_ratings(self):
+        """Elo ratings for pricing, resolved at most every RATINGS_TTL seconds; the last good ones if that fails."""
+        if self.ratings_at is None or time.monotonic() - self.ratings_at >= RATINGS_TTL:
+            # Not retried before the TTL either way, so a failing Elo source is not hit on every poll
+            self.ratings_at = time.monotonic()
+            try:
+                self.cached_ratings = self.ratings()
+            except Exception as e:
+                print(f"Elo ratings refresh failed, pricing with the previous ones: {e}")
+        return self.cached_ratings
+
+    def poll(self):
+        try:
+            current = self.fetch()
+        except Exception as e:
+            # Keep serving the previous snapshot until upstream recovers
+            print(f"Scoreboard poll failed: {e}")
+            self.first_snapshot.set()
+            return
+        # Scores are published before repricing, so a failing or slow pricing step never holds them back
+        with self.lock:
+            changed = diff_games(self.snapshot, current)
+            self.snapshot = current
+            self.updated_at = time.time()
+            subscribers = list(self.subscribers)
+        try:
+            odds = price_games(current, self.current_ratings())
+        except Exception as e:
+            # Keep serving the previous odds
+            print(f"Repricing failed: {e}")
+        else:
+            with self.lock:
+                self.odds = odds
+        self.first_snapshot.set()
+        if not changed.empty:
+            for callback in subscribers:
+                # A failing subscriber must not stop the poller thread
+                try:
+                    callback(changed)
+                except Exception as e:
+                    print(f"Scoreboard subscriber {getattr(callback, '__name__', callback)} failed: {e}")
+
+    def subscribe(self, callback):
+        """Call callback(changed_games) after every poll that changes a score or status."""
+        with self.lock:
+            self.subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def latest(self, timeout=FIRST_SNAPSHOT_TIMEOUT):
+        # Only the very first reader of a fresh process waits for the first poll
+        self.first_snapshot.wait(timeout)
+        with self.lock:
+            return self.snapshot
+
+    def latest_odds(self, timeout=FIRST_SNAPSHOT_TIMEOUT):
+        """Odds table of the latest snapshot (see utils.price_games)."""
+        self.first_snapshot.wait(timeout)
+        with self.lock:
+            return self.odds
+
+_poller = None
+_poller_lock = threading.Lock()
+
+def get_poller():
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = ScoreboardPoller().start()
+        return _poller
+
+def get_live_snapshot():
+    return get_poller().latest()
+
+def get_live_odds():
+    return get_poller().latest_odds()
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+import weakref
+from functools import wraps
+
+# Timers and counters around the hot paths: upstream calls, cache lookups,
+# DataFrame transformations and database queries. Recording is off unless
+# NBA_METRICS=1 (or enable() is called); while it is off, timer() returns a
+# shared no-op context manager and count() returns at once.
+#
+# Metrics are process-wide. streamlit_app.py shows the ones recorded during the
+# current rerun in a debug sidebar panel, and export them as Prometheus text or
+# JSON lines. Counts and totals are deltas between checkpoints; the longest
+# duration is kept per window instead: each checkpoint opens one (the rerun),
+# and every full export reports the maximum since the previous full export.
+
+ENABLED = os.environ.get('NBA_METRICS') == '1'
+METRICS_LOG = os.path.join('.cache', 'metrics.jsonl')
+
+def enable(enabled=True):
+    global ENABLED
+    ENABLED = enabled
+
+class Window:
+    """Longest duration of every timer observed while the window is open."""
+    __slots__ = ('longest', '__weakref__')
+
+    def __init__(self):
+        self.longest = {}  # (name, labels) -> max seconds
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = {}  # (name, labels) -> [count, total seconds]
+        self.counters = {}  # (name, labels) -> value
+        # Weak references to the open windows; a window closes when nothing references it any more
+        self.windows = []
+        self.export_window = self.open_window()
+
+    def open_window(self):
+        window = Window()
+        with self.lock:
+            # Closed windows are dropped here, as every rerun opens a new one
+            self.windows = [ref for ref in self.windows if ref() is not None] + [weakref.ref(window)]
+        return window
+
+    def next_export_window(self):
+        """The window of the previous full export, replaced by a new one."""
+        window = self.open_window()
+        previous, self.export_window = self.export_window, window
+        return previous
+
+    def observe(self, name, seconds, labels=()):
+        key = (name, labels)
+        with self.lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                self.timers[key] = [1, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+            for ref in self.windows:
+                window = ref()
+                if window is not None and seconds > window.longest.get(key, 0.0):
+                    window.longest[key] = seconds
+
+    def increment(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {'timers': {key: list(timer) for key, timer in self.timers.items()},
+                    'counters': dict(self.counters)}
+
+    def reset(self):
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+            for ref in self.windows:
+                window = ref()
+                if window is not None:
+                    window.longest.clear()
+
+registry = Registry()
+
+class Timer:
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+
+class NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NO_TIMER = NoTimer()
+
+def timer(name, **labels):
+    """Context manager recording the duration of its block under name and labels."""
+    if not ENABLED:
+        return NO_TIMER
+    return Timer(name, tuple(sorted(labels.items())))
+
+def timed(name, **labels):
+    """Decorator recording the duration of every call of the function."""
+    labels = tuple(sorted(labels.items()))
+
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with Timer(name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, value=1, **labels):
+    if ENABLED:
+        registry.increment(name, value, tuple(sorted(labels.items())))
+
+def checkpoint():
+    """Snapshot of every metric, to report what a rerun recorded with rows(since=...)."""
+    if not ENABLED:
+        return None
+    window = registry.open_window()
+    return dict(registry.snapshot(), window=window)
+
+def rows(since=None, window=None):
+    """
+    One dict per metric; with since, only what was recorded after that checkpoint.
+
+    max_seconds is the longest duration in the checkpoint's window, or in the
+    given one (default: since the previous full export).
+    """
+    current = registry.snapshot()
+    before = since or {'timers': {}, 'counters': {}}
+    window = window or (since['window'] if since else registry.export_window)
+    result = []
+    for (name, labels), (n, total) in current['timers'].items():
+        previous = before['timers'].get((name, labels), [0, 0.0])
+        if n > previous[0]:
+            result.append({'metric': name, 'labels': dict(labels), 'count': n - previous[0],
+                           'seconds': total - previous[1],
+                           'max_seconds': window.longest.get((name, labels), 0.0)})
+    for (name, labels), value in current['counters'].items():
+        delta = value - before['counters'].get((name, labels), 0)
+        if delta:
+            result.append({'metric': name, 'labels': dict(labels), 'count': delta})
+    return sorted(result, key=lambda row: -row.get('seconds', 0))
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+def prometheus_text(window=None):
+    """
+    All metrics in the Prometheus text exposition format.
+
+    _max is taken from window, by default that of the previous full export, which this export then starts anew.
+    """
+    window = window or registry.next_export_window()
+    current = registry.snapshot()
+    lines = []
+    for (name, labels), (n, total) in sorted(current['timers'].items()):
+        lines.append(f"{name}_count{_format_labels(labels)} {n}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_max{_format_labels(labels)} {window.longest.get((name, labels), 0.0):.6f}")
+    for (name, labels), value in sorted(current['counters'].items()):
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+def json_lines(since=None, window=None):
+    now = time.time()
+    window = window or (None if since else registry.next_export_window())
+    return ''.join(json.dumps(dict(row, time=now)) + '\n' for row in rows(since, window))
+
+def export(path=METRICS_LOG, since=None):
+    """Append the metrics (recorded since a checkpoint, or all) to a JSON lines file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json_lines(since))
+
+def debug_panel(since=None):
+    """Sidebar panel with the metrics recorded since the checkpoint (the current rerun)."""
+    if not ENABLED:
+        return
+    import streamlit as st
+    import pandas as pd
+
+    with st.sidebar.expander("Debug: metrics"):
+        table = pd.DataFrame(rows(since))
+        if table.empty:
+            st.write("Nothing recorded in this rerun.")
+        else:
+            table['labels'] = table['labels'].map(lambda labels: ', '.join(f"{k}={v}" for k, v in labels.items()))
+            st.dataframe(table, hide_index=True)
+        # Exports are built on request only, and both from one window, as each full export starts a new one
+        if st.button("Export all metrics"):
+            window = registry.next_export_window()
+            st.download_button("Prometheus", prometheus_text(window), file_name='metrics.prom')
+            st.download_button("JSON lines", json_lines(window=window), file_name='metrics.jsonl')
+
+if __name__ == "__main__":
+    # Overhead per timed block, disabled and enabled, against an empty loop
+    n = 200_000
+    start = time.perf_counter()
+    for _ in range(n):
+        pass
+    print(f"{'baseline':8} {(time.perf_counter() - start) / n * 1e9:8.0f} ns per iteration")
+    for enabled in (False, True):
+        enable(enabled)
+        start = time.perf_counter()
+        for _ in range(n):
+            with timer('benchmark_seconds', step='noop'):
+                pass
+        print(f"{'enabled' if enabled else 'disabled':8} {(time.perf_counter() - start) / n * 1e9:8.0f} ns per timer")
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from utils import fetch_data, CURRENT_SEASON
+
+# Player performance from game logs (PlayerGameLog for one player, LeagueGameLog
+# for every player at once): rolling averages, per-36 and usage-style rates and
+# season splits, all computed column-wise over the whole log.
+
+STATS = ['MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'PLUS_MINUS']
+WINDOWS = (5, 10, 20)
+
+def prepare_game_log(log):
+    """Game log with uniform column names and types, sorted by player and date."""
+    log = log.rename(columns={'Player_ID': 'PLAYER_ID', 'Game_ID': 'GAME_ID'})
+    log = log.assign(
+        GAME_DATE=pd.to_datetime(log['GAME_DATE'], format='mixed'),
+        HOME=log['MATCHUP'].str.contains('vs.', regex=False),
+    )
+    log[STATS] = log[STATS].astype(float)
+    return log.sort_values(['PLAYER_ID', 'GAME_DATE', 'GAME_ID'], ignore_index=True)
+
+def rolling_averages(log, windows=WINDOWS, stats=STATS):
+    """
+    Per-game rolling averages over each player's last N games (e.g. PTS_L5).
+
+    Uses per-player cumulative sums, so every window is one vectorized subtraction.
+    """
+    log = log.reset_index(drop=True)
+    values = log[stats].to_numpy(dtype=float)
+    players = log['PLAYER_ID'].to_numpy()
+    # Position of each game within its player's log
+    first = np.r_[True, players[1:] != players[:-1]]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(len(log)), 0))
+    position = np.arange(len(log)) - group_start
+
+    cumulative = np.vstack([np.zeros(len(stats)), np.cumsum(values, axis=0)])
+    columns = {}
+    for window in windows:
+        count = np.minimum(position + 1, window)
+        start = np.arange(len(log)) + 1 - count
+        means = (cumulative[np.arange(len(log)) + 1] - cumulative[start]) / count[:, None]
+        for i, stat in enumerate(stats):
+            columns[f"{stat}_L{window}"] = means[:, i]
+    return pd.concat([log, pd.DataFrame(columns, index=log.index)], axis=1)
+
+def rates(totals):
+    """Per-36, shooting and usage-style rates from summed stats (one row per player)."""
+    minutes = totals['MIN'].where(totals['MIN'] > 0)
+    shots = totals['FGA'] + 0.44 * totals['FTA']
+    return pd.DataFrame({
+        'PTS_PER36': totals['PTS'] / minutes * 36,
+        'REB_PER36': totals['REB'] / minutes * 36,
+        'AST_PER36': totals['AST'] / minutes * 36,
+        # Possessions a player ends with a shot, free throws or a turnover, per 36 minutes
+        'USAGE_PER36': (shots + totals['TOV']) / minutes * 36,
+        'TS_PCT': totals['PTS'] / (2 * shots.where(shots > 0)),
+        'AST_TOV': totals['AST'] / totals['TOV'].where(totals['TOV'] > 0),
+    }, index=totals.index)
+
+def season_splits(log, by='HOME'):
+    """Per-game averages per player, split by a column such as HOME or WL."""
+    return log.groupby(['PLAYER_ID', by])[STATS].mean().unstack(by)
+
+class PlayerPerformance:
+    """
+    Season totals and recent-form windows for many players, updated incrementally.
+
+    Only each player's last max(windows) games and their running season totals are
+    kept, so new game rows are folded in without revisiting the full log.
+    """
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = windows
+        self.recent = pd.DataFrame()
+        self.totals = pd.DataFrame(columns=STATS + ['GP'], dtype=float)
+        self.last_game = pd.Series(dtype='datetime64[ns]')
+
+    def update(self, log):
+        """Fold new game rows in. Returns the number of rows applied."""
+        log = prepare_game_log(log)
+        # Drop rows already applied: games on or before each player's last seen date
+        last = self.last_game.reindex(log['PLAYER_ID']).to_numpy()
+        log = log[pd.isna(last) | (log['GAME_DATE'].to_numpy() > last)]
+        if log.empty:
+            return 0
+
+        added = log.groupby('PLAYER_ID')[STATS].sum().assign(GP=log.groupby('PLAYER_ID').size())
+        self.totals = self.totals.add(added, fill_value=0)
+        self.last_game = log.groupby('PLAYER_ID')['GAME_DATE'].max().combine_first(self.last_game)
+        recent = pd.concat([self.recent, log], ignore_index=True) if not self.recent.empty else log
+        self.recent = recent.sort_values(['PLAYER_ID', 'GAME_DATE']).groupby('PLAYER_ID').tail(max(self.windows))
+        return len(log)
+
+    def summary(self, stats=('PTS', 'REB', 'AST')):
+        """One row per player: games, season per-game averages, rates and last-N averages."""
+        stats = list(stats)
+        per_game = self.totals[stats].div(self.totals['GP'], axis=0)
+        parts = [self.totals[['GP']], per_game, rates(self.totals)]
+        grouped = self.recent.groupby('PLAYER_ID')
+        for window in self.windows:
+            parts.append(grouped.tail(window).groupby('PLAYER_ID')[stats].mean().add_suffix(f"_L{window}"))
+        names = self.recent.groupby('PLAYER_ID')['PLAYER_NAME'].last() if 'PLAYER_NAME' in self.recent else None
+        summary = pd.concat(parts, axis=1)
+        if names is not None:
+            summary.insert(0, 'PLAYER_NAME', names)
+        return summary
+
+def fetch_league_game_log(season=CURRENT_SEASON):
+    # Every player's game log for the season in a single request
+    from nba_api.stats.endpoints import leaguegamelog
+    return fetch_data(leaguegamelog.LeagueGameLog, player_or_team_abbreviation='P', season=season)
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+
+# Process-wide coordination of upstream requests to stats.nba.com: every thread
+# and Streamlit session shares one request budget, one set of in-flight requests
+# and one circuit breaker.
+
+REQUESTS_PER_SECOND = float(os.environ.get('NBA_REQUESTS_PER_SECOND', 5))
+BURST = int(os.environ.get('NBA_REQUEST_BURST', 5))
+FAILURE_THRESHOLD = int(os.environ.get('NBA_BREAKER_FAILURES', 5))  # consecutive failures before tripping
+RESET_TIMEOUT = float(os.environ.get('NBA_BREAKER_RESET', 60))  # seconds before trying upstream again
+
+class CircuitOpenError(Exception):
+    pass
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Stops calling upstream after repeated failures.
+
+    Closed: requests go through. Open: requests are refused until reset_timeout
+    has passed. Half-open: a single trial request decides whether to close again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Runs identical concurrent calls once and hands the result to every caller."""
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+class RequestScheduler:
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST,
+                 failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.single_flight = SingleFlight()
+
+    def run(self, key, fn):
+        """Run fn() once for all concurrent callers asking for the same key."""
+        return self.single_flight.do(key, fn)
+
+    def attempt(self, fn):
+        """
+        Make one upstream call within the request budget.
+
+        Raises CircuitOpenError without calling upstream while the breaker is open.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Upstream is unavailable, circuit breaker is open")
+        self.bucket.acquire()
+        try:
+            result = fn()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
@@ -0,0 +1,79 @@
+import time
+import pandas as pd
+import numpy as np
+import metrics
+
+@metrics.timed('nba_transform_seconds', step='settle_bets')
+def settle_bets(bets, games):
+    """
+    Settle bets against a normalized game table in one vectorized pass.
+
+    :param bets: DataFrame of bets with game_id, home_team, away_team, chosen_team, odds and stake
+    :param games: Game table with gameId, homeTeamScore and awayTeamScore (see utils.get_past_games)
+    :return: Copy of bets with 'result' (Win/Loss/Pending) and 'actual_payout' columns
+    """
+    # Join on integer-coded game ids ('0022400095' -> 22400095), whatever form each side uses
+    scores = games[['gameId', 'homeTeamScore', 'awayTeamScore']].drop_duplicates('gameId')
+    scores = scores.rename(columns={'gameId': 'game_key'})
+    scores['game_key'] = pd.to_numeric(scores['game_key']).astype('Int64')
+    settled = bets.assign(game_key=pd.to_numeric(bets['game_id'], errors='coerce').astype('Int64'))
+    settled = settled.merge(scores, on='game_key', how='left').drop(columns='game_key')
+
+    # A bet is pending until its game shows up in the game table
+    played = settled['homeTeamScore'].notna().to_numpy()
+    winner = np.where(
+        settled['homeTeamScore'] > settled['awayTeamScore'],
+        settled['home_team'],
+        settled['away_team']
+    )
+    won = played & (settled['chosen_team'].to_numpy() == winner)
+
+    settled['result'] = np.select([~played, won], ['Pending', 'Win'], 'Loss')
+    settled['actual_payout'] = np.where(won, settled['stake'] * settled['odds'], 0.0)
+
+    return settled.drop(columns=['homeTeamScore', 'awayTeamScore'])
+
+def summarize_bets(settled):
+    """Total stake, total payout, net profit and ROI (in %) of settled bets."""
+    total_stake = float(settled['stake'].sum())
+    total_payout = float(settled['actual_payout'].sum())
+    net_profit = total_payout - total_stake
+    roi = net_profit / total_stake * 100 if total_stake else 0.0
+    return {
+        'total_stake': total_stake,
+        'total_payout': total_payout,
+        'net_profit': net_profit,
+        'roi': roi,
+    }
+
+def _random_bets(n_bets, n_games, seed=0):
+    rng = np.random.default_rng(seed)
+    game_ids = np.array([f"00224{i:05d}" for i in range(n_games)])
+    games = pd.DataFrame({
+        'gameId': game_ids,
+        'homeTeamScore': rng.integers(85, 135, n_games),
+        'awayTeamScore': rng.integers(85, 135, n_games),
+    })
+    # Bet on a few games that are not played yet so some bets stay pending
+    picks = rng.integers(0, n_games + 10, n_bets)
+    home = rng.random(n_bets) < 0.5
+    bets = pd.DataFrame({
+        'game_id': np.array([f"00224{i:05d}" for i in range(n_games + 10)])[picks],
+        'home_team': 'Home',
+        'away_team': 'Away',
+        'chosen_team': np.where(home, 'Home', 'Away'),
+        'odds': rng.uniform(1.1, 4.0, n_bets).round(2),
+        'stake': rng.integers(1, 100, n_bets).astype(float),
+    })
+    return bets, games
+
+if __name__ == "__main__":
+    # Benchmark: settle 100k bets against a full regular season (1,230 games)
+    bets, games = _random_bets(100_000, 1230)
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        summary = summarize_bets(settle_bets(bets, games))
+        runs.append(time.perf_counter() - start)
+    print(f"Settled {len(bets):,} bets in {min(runs) * 1000:.1f} ms (best of {len(runs)})")
+    print(summary)
@@ -0,0 +1,260 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import fetch_data, get_past_games, calculate_win_probability, CURRENT_SEASON, GAME_TABLE_TTL
+
+# Monte Carlo projection of the rest of the season: every simulation plays the
+# remaining schedule with the current Elo ratings, ranks each conference, runs
+# the play-in and a best-of-seven bracket. All simulations of a chunk are played
+# at once as arrays; chunks are spread over processes for large runs. Chunks get
+# their own seeds from one SeedSequence, so results only depend on the seed.
+
+N_SIMULATIONS = 10_000
+CHUNK_SIZE = 5_000  # simulations per chunk (and per task in parallel runs)
+PARALLEL_MIN = 20_000  # runs this large use all cores by default
+SERIES_WINS = 4  # best of seven
+EAST = {'ATL', 'BOS', 'BKN', 'CHA', 'CHI', 'CLE', 'DET', 'IND', 'MIA', 'MIL', 'NYK', 'ORL', 'PHI', 'TOR', 'WAS'}
+
+def _games(rng, ratings, a, b):
+    # Single games between team index arrays a and b; returns the winners
+    won = rng.random(a.shape) < calculate_win_probability(ratings[a], ratings[b])
+    return np.where(won, a, b)
+
+def _series(rng, ratings, a, b):
+    p = calculate_win_probability(ratings[a], ratings[b])
+    wins = (rng.random(a.shape + (2 * SERIES_WINS - 1,)) < p[..., None]).sum(axis=-1)
+    return np.where(wins >= SERIES_WINS, a, b)
+
+def _bracket(rng, ratings, seeds):
+    """
+    Play-in and playoffs of one conference.
+
+    :param seeds: (simulations, teams) team indices in seed order
+    :return: Playoff teams (simulations, 8) and conference champions (simulations,)
+    """
+    seven_eight = _games(rng, ratings, seeds[:, 6], seeds[:, 7])
+    loser = np.where(seven_eight == seeds[:, 6], seeds[:, 7], seeds[:, 6])
+    nine_ten = _games(rng, ratings, seeds[:, 8], seeds[:, 9])
+    eighth = _games(rng, ratings, loser, nine_ten)
+    playoffs = np.column_stack([seeds[:, :6], seven_eight, eighth])
+
+    # 1-8, 4-5, 3-6, 2-7, then winners meet in bracket order
+    teams = playoffs[:, [0, 7, 3, 4, 2, 5, 1, 6]]
+    while teams.shape[1] > 1:
+        teams = _series(rng, ratings, teams[:, 0::2], teams[:, 1::2])
+    return playoffs, teams[:, 0]
+
+def simulate_chunk(seed, n_sims, ratings, home, away, wins, conferences):
+    """
+    Play n_sims seasons and return their counts: final wins histogram, seed
+    counts, playoff, conference title and title counts per team.
+    """
+    rng = np.random.default_rng(seed)
+    n_teams = len(ratings)
+    # Remaining games: one row per simulation, home wins where the draw is under the probability
+    home_won = rng.random((n_sims, len(home))) < calculate_win_probability(ratings[home], ratings[away])
+    final = np.repeat(wins[None, :], n_sims, axis=0)
+    for won, team in ((home_won, home), (~home_won, away)):
+        final += won.astype(np.int16) @ np.eye(n_teams, dtype=np.int16)[team]
+
+    counts = {
+        'wins': np.zeros((n_teams, final.max() + 1), dtype=np.int64),
+        'seeds': np.zeros((n_teams, n_teams), dtype=np.int64),
+        'playoffs': np.zeros(n_teams, dtype=np.int64),
+        'conference': np.zeros(n_teams, dtype=np.int64),
+        'title': np.zeros(n_teams, dtype=np.int64),
+    }
+    np.add.at(counts['wins'], (np.arange(n_teams)[None, :].repeat(n_sims, 0), final), 1)
+
+    # Random tie-breaks: ties are rare enough that the real rules barely matter
+    order = final + rng.random(final.shape)
+    champions = []
+    for conference in np.unique(conferences):
+        members = np.flatnonzero(conferences == conference)
+        seeds = members[np.argsort(-order[:, members], axis=1)]
+        np.add.at(counts['seeds'], (seeds, np.arange(len(members))[None, :]), 1)
+        playoffs, champion = _bracket(rng, ratings, seeds)
+        counts['playoffs'] += np.bincount(playoffs.ravel(), minlength=n_teams)
+        counts['conference'] += np.bincount(champion, minlength=n_teams)
+        champions.append(champion)
+    counts['title'] += np.bincount(_series(rng, ratings, champions[0], champions[1]), minlength=n_teams)
+    return counts
+
+def _chunk_task(args):
+    return simulate_chunk(*args)
+
+def _merge(totals, counts):
+    if totals is None:
+        return counts
+    width = max(totals['wins'].shape[1], counts['wins'].shape[1])
+    for key in counts:
+        if key == 'wins':
+            merged = np.zeros((len(totals[key]), width), dtype=np.int64)
+            merged[:, :totals[key].shape[1]] += totals[key]
+            merged[:, :counts[key].shape[1]] += counts[key]
+            totals[key] = merged
+        else:
+            totals[key] += counts[key]
+    return totals
+
+def simulate_season(ratings, home, away, wins, losses, conferences, n_sims=N_SIMULATIONS, seed=0, processes=None):
+    """
+    Projected standings and playoff odds from the remaining schedule.
+
+    :param ratings: Elo rating per team index
+    :param home: Team index of the home side of every remaining game (away likewise)
+    :param wins: Wins so far per team index (losses likewise)
+    :param conferences: Conference label per team index ('East'/'West')
+    :param processes: Worker processes (default: all cores for runs of PARALLEL_MIN or more, else 1)
+    :return: DataFrame per team index with projected wins, seed probabilities (SEED_1, ...)
+             and PLAYOFFS, CONFERENCE and TITLE probabilities
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    home, away = np.asarray(home, dtype=np.intp), np.asarray(away, dtype=np.intp)
+    wins, losses = np.asarray(wins, dtype=np.int16), np.asarray(losses, dtype=np.int16)
+    conferences = np.asarray(conferences)
+    sizes = [min(CHUNK_SIZE, n_sims - start) for start in range(0, n_sims, CHUNK_SIZE)]
+    tasks = [(child, size, ratings, home, away, wins, conferences)
+             for child, size in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes)]
+    if processes is None:
+        processes = os.cpu_count() if n_sims >= PARALLEL_MIN else 1
+
+    totals = None
+    if processes > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for counts in executor.map(_chunk_task, tasks):
+                totals = _merge(totals, counts)
+    else:
+        for task in tasks:
+            totals = _merge(totals, _chunk_task(task))
+
+    distribution = totals['wins'] / n_sims
+    total_wins = np.arange(distribution.shape[1])
+    cumulative = distribution.cumsum(axis=1)
+    projection = pd.DataFrame({
+        'CONFERENCE': conferences,
+        'WINS': wins,
+        'LOSSES': losses,
+        'PROJECTED_WINS': distribution @ total_wins,
+        'WINS_P10': (cumulative < 0.1).sum(axis=1),
+        'WINS_P90': (cumulative < 0.9).sum(axis=1),
+        'PLAYOFFS': totals['playoffs'] / n_sims,
+        'CONFERENCE_TITLE': totals['conference'] / n_sims,
+        'TITLE': totals['title'] / n_sims,
+    })
+    seeds = pd.DataFrame(totals['seeds'] / n_sims, columns=[f"SEED_{i}" for i in range(1, len(ratings) + 1)])
+    seeds = seeds.loc[:, seeds.sum() > 0]
+    return pd.concat([projection, seeds], axis=1)
+
+def fetch_schedule(season=CURRENT_SEASON):
+    from nba_api.stats.endpoints import scheduleleaguev2
+    return fetch_data(scheduleleaguev2.ScheduleLeagueV2, season=season)
+
+def is_regular_season(game_ids):
+    # Game ids are 00<type><season><number>; type 2 is the regular season ('0022400095')
+    return pd.to_numeric(pd.Series(game_ids)).to_numpy() // 10**7 == 2
+
+def project_season(season=CURRENT_SEASON, n_sims=N_SIMULATIONS, seed=0, processes=None):
+    """Projection of the season from its played games, schedule and Elo ratings (None without a schedule)."""
+    from entities import get_team_index
+    from elo import get_elo_engine
+
+    schedule = fetch_schedule(season)
+    if schedule is None or schedule.empty:
+        return None
+    teams = get_team_index().teams
+    index = {team['id']: i for i, team in enumerate(teams)}
+
+    played = get_past_games(season)
+    played = played[is_regular_season(played['gameId'])
+                    & played['homeTeamId'].astype('int64').isin(index) & played['awayTeamId'].astype('int64').isin(index)]
+    home_won = (played['homeTeamScore'] > played['awayTeamScore']).to_numpy()
+    home_ids = played['homeTeamId'].astype('int64').map(index).to_numpy()
+    away_ids = played['awayTeamId'].astype('int64').map(index).to_numpy()
+    winners = np.where(home_won, home_ids, away_ids)
+    losers = np.where(home_won, away_ids, home_ids)
+
+    remaining = schedule[is_regular_season(schedule['gameId']) & (schedule['gameStatus'] != 3)
+                         & ~schedule['gameId'].astype(int).isin(played['gameId'].astype(int))]
+    remaining = remaining[remaining['homeTeam_teamId'].isin(index) & remaining['awayTeam_teamId'].isin(index)]
+
+    engine = get_elo_engine(season)
+    projection = simulate_season(
+        [engine.rating(team['id']) for team in teams],
+        remaining['homeTeam_teamId'].map(index).to_numpy(),
+        remaining['awayTeam_teamId'].map(index).to_numpy(),
+        np.bincount(winners, minlength=len(teams)),
+        np.bincount(losers, minlength=len(teams)),
+        ['East' if team['abbreviation'] in EAST else 'West' for team in teams],
+        n_sims, seed, processes,
+    )
+    projection.insert(0, 'TEAM', [team['full_name'] for team in teams])
+    projection.insert(0, 'TEAM_ID', [team['id'] for team in teams])
+    return projection
+
+_projections = {}
+_projection_locks = {}
+_projections_lock = threading.Lock()
+
+def _is_current(cached):
+    return cached is not None and time.monotonic() - cached[0] <= GAME_TABLE_TTL
+
+def get_projection(season=CURRENT_SEASON):
+    # Shared by all sessions and recomputed at most every GAME_TABLE_TTL seconds.
+    # A projection holds only its season's lock, as in utils.get_game_table.
+    with _projections_lock:
+        cached = _projections.get(season)
+        season_lock = _projection_locks.setdefault(season, threading.Lock())
+    if _is_current(cached):
+        return cached[1]
+    with season_lock:
+        with _projections_lock:
+            cached = _projections.get(season)
+        # Computed by another caller while this one waited
+        if _is_current(cached):
+            return cached[1]
+        projection = project_season(season)
+        # No schedule (or a failed fetch) is not kept, so the next caller tries again
+        if projection is not None:
+            with _projections_lock:
+                _projections[season] = (time.monotonic(), projection)
+        return projection
+
+def random_league(n_teams=30, n_games=1230, played=615, seed=0):
+    # Synthetic ratings, schedule and records for the benchmark
+    rng = np.random.default_rng(seed)
+    home = rng.integers(0, n_teams, n_games)
+    away = (home + rng.integers(1, n_teams, n_games)) % n_teams
+    ratings = rng.normal(1500, 100, n_teams)
+    home_won = rng.random(played) < calculate_win_probability(ratings[home[:played]], ratings[away[:played]])
+    winners = np.where(home_won, home[:played], away[:played])
+    losers = np.where(home_won, away[:played], home[:played])
+    conferences = np.where(np.arange(n_teams) < n_teams // 2, 'East', 'West')
+    return (ratings, home[played:], away[played:], np.bincount(winners, minlength=n_teams),
+            np.bincount(losers, minlength=n_teams), conferences)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the season simulator on a synthetic league.")
+    parser.add_argument('--simulations', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    league = random_league()
+    print(f"{len(league[1])} remaining games, {os.cpu_count()} cores")
+    for n_sims in args.simulations:
+        for processes in (1, os.cpu_count()):
+            start = time.perf_counter()
+            projection = simulate_season(*league, n_sims=n_sims, seed=args.seed, processes=processes)
+            elapsed = time.perf_counter() - start
+            print(f"  {n_sims:>9,} simulations, {processes:>2} process(es): {elapsed:7.2f} s")
+    again = simulate_season(*league, n_sims=args.simulations[0], seed=args.seed, processes=1)
+    same = simulate_season(*league, n_sims=args.simulations[0], seed=args.seed, processes=os.cpu_count())
+    print(f"Deterministic across process counts: {again.equals(same)}")
+    print(projection.sort_values('TITLE', ascending=False).head(5).round(3).to_string())
+
+if __name__ == "__main__":
+    main()
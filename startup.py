@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+# Cold-start tracking. streamlit_app.py imports this module first, so
+# PROCESS_START is (close to) the moment the server started running the app.
+# Each page calls mark_first_paint() right after drawing its title, and the
+# first paint of every page in a process is appended to STARTUP_LOG.
+#
+# Run `python startup.py` for an import-time report of the app's dependencies.
+
+PROCESS_START = time.perf_counter()
+STARTUP_LOG = os.path.join('.cache', 'startup.jsonl')
+
+# Modules pages load before (or right after) their first paint
+PROFILED_MODULES = [
+    'streamlit', 'pandas', 'numpy', 'pyarrow', 'requests', 'plotly.express',
+    'st_supabase_connection', 'nba_api.stats.static.teams', 'nba_api.stats.endpoints',
+    'nba_api.live.nba.endpoints', 'utils', 'elo', 'ledger', 'live',
+]
+
+_painted = set()
+_painted_lock = threading.Lock()
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+def mark_first_paint(page):
+    with _painted_lock:
+        if page in _painted:
+            return
+        _painted.add(page)
+    record = {
+        'event': 'first_paint',
+        'page': page,
+        'seconds_since_start': round(time.perf_counter() - PROCESS_START, 4),
+        'time': time.time(),
+    }
+    try:
+        os.makedirs(os.path.dirname(STARTUP_LOG), exist_ok=True)
+        with open(STARTUP_LOG, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    except OSError:
+        pass
+
+def import_time(module):
+    """Cumulative import time of a module in a fresh interpreter, in seconds (None if not installed)."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        return None
+    # The last line of -X importtime output is the requested module itself
+    match = re.search(r'\|\s*(\d+)\s*\|[^\n]*$', result.stderr.strip())
+    return int(match.group(1)) / 1e6 if match else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import times and recorded first paints of the app.")
+    parser.add_argument('--json', metavar='PATH', help="Also append the report as a JSON line to PATH")
+    args = parser.parse_args()
+
+    imports = {module: import_time(module) for module in PROFILED_MODULES}
+    print("Import time (fresh interpreter, cumulative):")
+    for module, seconds in sorted(imports.items(), key=lambda item: -(item[1] or 0)):
+        print(f"  {module:30} {'not installed' if seconds is None else f'{seconds * 1000:8.1f} ms'}")
+
+    paints = []
+    if os.path.exists(STARTUP_LOG):
+        with open(STARTUP_LOG) as f:
+            paints = [json.loads(line) for line in f if line.strip()]
+    if paints:
+        print("Recorded first paints (latest per page):")
+        latest = {paint['page']: paint for paint in paints}
+        for page, paint in latest.items():
+            print(f"  {page:30} {paint['seconds_since_start'] * 1000:8.1f} ms after start")
+
+    if args.json:
+        report = {
+            'revision': git_revision(),
+            'time': time.time(),
+            'import_seconds': imports,
+            'first_paint_seconds': {paint['page']: paint['seconds_since_start'] for paint in paints},
+        }
+        with open(args.json, 'a') as f:
+            f.write(json.dumps(report) + '\n')
+
+if __name__ == "__main__":
+    main()
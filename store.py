@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+import pandas as pd
+
+# Persistent, content-addressed cache of nba_api responses.
+# Each (endpoint class, kwargs) request is hashed into a key and stored as
+# <key>.parquet (the returned DataFrame) next to <key>.json (request and fetch time).
+
+CACHE_DIR = os.environ.get('NBA_CACHE_DIR', os.path.join('.cache', 'nba_api'))
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# How long a cached response stays fresh, per endpoint class (seconds, None = forever)
+FRESHNESS = {
+    'LeagueGameFinder': HOUR,
+    'TeamGameLog': HOUR,
+    'PlayerGameLog': HOUR,
+    'CommonTeamRoster': DAY,
+    'CommonPlayerInfo': DAY,
+    'PlayerCareerStats': DAY,
+    'TeamYearByYearStats': DAY,
+    'TeamDetails': 7 * DAY,
+}
+DEFAULT_FRESHNESS = HOUR
+
+SEASON_KWARGS = ('season', 'season_nullable')
+
+def current_season_start(today=None):
+    # NBA seasons start in October, so January-September belong to last year's season
+    today = today or date.today()
+    return today.year if today.month >= 10 else today.year - 1
+
+def season_start(season):
+    # Accepts '2023-24', '2023' or 2023
+    match = re.match(r'\d{4}', str(season))
+    return int(match.group()) if match else None
+
+def season_end(start):
+    # The point current_season_start moves past a season, see games_dataset.is_finished
+    return datetime(start + 1, 10, 1).timestamp()
+
+def endpoint_name(endpoint):
+    return getattr(endpoint, '__name__', type(endpoint).__name__)
+
+def freshness(endpoint, kwargs, fetched_at):
+    # Games from past seasons never change, so responses fetched after the season
+    # ended never expire; one fetched while it was running is refreshed once more
+    for name in SEASON_KWARGS:
+        start = season_start(kwargs.get(name, ''))
+        if start is not None and start < current_season_start() and fetched_at >= season_end(start):
+            return None
+    return FRESHNESS.get(endpoint_name(endpoint), DEFAULT_FRESHNESS)
+
+def request_key(endpoint, kwargs):
+    request = {
+        'endpoint': f"{getattr(endpoint, '__module__', '')}.{endpoint_name(endpoint)}",
+        'kwargs': {k: kwargs[k] for k in sorted(kwargs)},
+    }
+    payload = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest(), request
+
+def _paths(key, root=None):
+    base = os.path.join(root or CACHE_DIR, key[:2], key)
+    return base + '.parquet', base + '.json'
+
+def load(endpoint, kwargs, root=None):
+    """
+    Read a cached response.
+
+    :param root: Cache directory to read from (default CACHE_DIR), e.g. a replay snapshot
+    :return: Tuple (DataFrame, is_fresh), or (None, False) when nothing is cached
+    """
+    key, _ = request_key(endpoint, kwargs)
+    data_path, meta_path = _paths(key, root)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        df = pd.read_parquet(data_path)
+    except (OSError, ValueError):
+        return None, False
+
+    ttl = freshness(endpoint, kwargs, meta['fetched_at'])
+    is_fresh = ttl is None or time.time() - meta['fetched_at'] < ttl
+    return df, is_fresh
+
+def save(endpoint, kwargs, df, root=None):
+    key, request = request_key(endpoint, kwargs)
+    data_path, meta_path = _paths(key, root)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+    # Write to temporary files first so readers never see a half-written entry
+    try:
+        df.to_parquet(data_path + '.tmp', index=False)
+    except Exception as e:
+        print(f"Could not cache {request['endpoint']} response: {e}")
+        return
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(dict(request, fetched_at=time.time()), f, default=str)
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(meta_path + '.tmp', meta_path)
+
+def clear():
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            os.remove(os.path.join(root, name))
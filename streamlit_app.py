@@ -1,6 +1,11 @@
+import startup  # first, so cold-start timings start here
 import streamlit as st
+import metrics
+import assets
 
 st.logo("basketball_logo.png", size="large")
+# Team logos are fetched into the local asset cache in the background, once per process
+assets.prewarm_logos()
 
 # Define your pages
 home_page = st.Page("0_Home.py", title="Home", icon="🏠")
@@ -18,4 +23,8 @@ pg = st.navigation(
     expanded=True
 )
 
-pg.run()
\ No newline at end of file
+# What the page recorded is shown in a debug panel when metrics are enabled (NBA_METRICS=1)
+checkpoint = metrics.checkpoint()
+with metrics.timer('nba_rerun_seconds', page=pg.title):
+    pg.run()
+metrics.debug_panel(checkpoint)
\ No newline at end of file
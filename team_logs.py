@@ -0,0 +1,103 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import metrics
+from utils import fetch_data, GAME_TABLE_TTL
+
+# Team game logs for the Teams page. One LeagueGameFinder request returns a
+# team's games of every season; it is parsed column-wise once, split by season
+# and kept in memory, so switching seasons is a dictionary lookup.
+
+REGULAR_SEASON = '2'  # first digit of SEASON_ID (1 preseason, 2 regular season, 4 playoffs)
+
+LOG_COLUMNS = ['GAME_DATE', 'SEASON', 'MATCHUP', 'OPPONENT', 'HOME', 'WL', 'PTS', 'OPP_PTS', 'SCORE', 'GAME_LINK']
+
+def prepare_team_log(games):
+    """
+    Game log with season, opponent, score string and NBA.com link, newest game first.
+
+    :param games: LeagueGameFinder rows of one team
+    """
+    games = games[games['SEASON_ID'].astype(str).str[0] == REGULAR_SEASON]
+    matchup = games['MATCHUP'].str.extract(r'^(?P<team>\S+) (?P<venue>vs\.|@) (?P<opponent>\S+)$')
+    points = games['PTS'].astype('Int64')
+    # Plus-minus is the final margin, so the opponent's points follow from it
+    opponent_points = (games['PTS'] - games['PLUS_MINUS']).round().astype('Int64')
+    score = points.astype(str) + ' - ' + opponent_points.astype(str)
+    log = pd.DataFrame({
+        'GAME_DATE': pd.to_datetime(games['GAME_DATE']),
+        'SEASON': games['SEASON_ID'].astype(str).str[1:].astype(int),
+        'MATCHUP': games['MATCHUP'],
+        'OPPONENT': matchup['opponent'],
+        'HOME': matchup['venue'] == 'vs.',
+        'WL': games['WL'],
+        'PTS': points,
+        'OPP_PTS': opponent_points,
+        'SCORE': score.where(opponent_points.notna(), points.astype(str)),
+        'GAME_LINK': 'https://www.nba.com/game/'
+                     + games['MATCHUP'].str.replace(' vs. ', '-vs-', regex=False).str.replace(' @ ', '-vs-', regex=False).str.lower()
+                     + '-' + games['GAME_ID'].astype(str),
+    })
+    return log.sort_values('GAME_DATE', ascending=False, ignore_index=True)
+
+def fetch_team_games(team_id):
+    # Every game of the team, all seasons, in a single request
+    from nba_api.stats.endpoints import leaguegamefinder
+    return fetch_data(leaguegamefinder.LeagueGameFinder, team_id_nullable=team_id, league_id_nullable='00')
+
+class TeamHistory:
+    """A team's game logs of every season, split by season start year."""
+
+    def __init__(self, log):
+        self.log = log
+        self.fetched_at = time.monotonic()
+        self.seasons = {season: rows.reset_index(drop=True) for season, rows in log.groupby('SEASON', sort=False)}
+
+    def is_fresh(self, ttl=GAME_TABLE_TTL):
+        return time.monotonic() - self.fetched_at < ttl
+
+    def season(self, season):
+        return self.seasons.get(int(season), self.log.iloc[[]])
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+def get_team_history(team_id):
+    """A team's full history (shared by all sessions), refetched once it is older than GAME_TABLE_TTL."""
+    with _histories_lock:
+        history = _histories.get(team_id)
+        if history is not None and history.is_fresh():
+            metrics.count('nba_team_history_requests_total', result='hit')
+            return history
+    metrics.count('nba_team_history_requests_total', result='miss')
+    with metrics.timer('nba_transform_seconds', step='team_history'):
+        games = fetch_team_games(team_id)
+        if games is None or games.empty:
+            # Keep serving the last history we had
+            return history if history is not None else TeamHistory(pd.DataFrame(columns=LOG_COLUMNS))
+        history = TeamHistory(prepare_team_log(games))
+    with _histories_lock:
+        _histories[team_id] = history
+    return history
+
+def invalidate_team_history(team_id=None):
+    with _histories_lock:
+        if team_id is None:
+            _histories.clear()
+        else:
+            _histories.pop(team_id, None)
+
+def get_team_season_log(team_id, season):
+    """
+    The team's games of the season starting in that year, newest first.
+
+    :param season: Season start year, e.g. 2024 for 2024-25
+    """
+    return get_team_history(team_id).season(season)
+
+def result_styles(log):
+    # Row colours of wins and losses, computed for the whole table at once
+    colors = np.select([log['WL'] == 'W', log['WL'] == 'L'],
+                       ['background-color: lightgreen', 'background-color: lightcoral'], '')
+    return pd.DataFrame(np.repeat(colors[:, None], log.shape[1], axis=1), index=log.index, columns=log.columns)
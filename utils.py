@@ -1,52 +1,59 @@
 # import streamlit as st
-from nba_api.stats.endpoints import playercareerstats, leaguegamefinder
-from nba_api.live.nba.endpoints import scoreboard
+# nba_api endpoint modules are imported where they are used, they are slow to load
 from requests.exceptions import ReadTimeout, TooManyRedirects, ConnectionError
+import os
 import time
+import threading
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+import store
+import games_dataset
+import metrics
+from games_dataset import GAME_TABLE_COLUMNS, compact_game_table, expand_game_table
+from scheduler import get_scheduler, CircuitOpenError
 
-def get_live_games():
-    board = scoreboard.ScoreBoard()
-    games = board.games.get_dict()
-    df = pd.DataFrame(games)
-
-    # Select and rename the desired columns
-    df_filtered = df[['gameId', 'gameStatusText', 'gameEt']].copy()
-    df_filtered['homeTeamId'] = df['homeTeam'].apply(lambda x: x['teamId'])
-    df_filtered['homeTeamName'] = df['homeTeam'].apply(lambda x: x['teamName'])
-    df_filtered['homeTeamScore'] = df['homeTeam'].apply(lambda x: x['score'])
-    df_filtered['awayTeamId'] = df['awayTeam'].apply(lambda x: x['teamId'])
-    df_filtered['awayTeamName'] = df['awayTeam'].apply(lambda x: x['teamName'])
-    df_filtered['awayTeamScore'] = df['awayTeam'].apply(lambda x: x['score'])
+def parse_scoreboard(games):
+    # Flatten the nested home/away team dicts of the live scoreboard in one pass
+    df_filtered = pd.DataFrame({
+        'gameId': [game['gameId'] for game in games],
+        'gameStatusText': [game['gameStatusText'] for game in games],
+        'gameDate': pd.to_datetime([game['gameEt'] for game in games]),
+        'homeTeamId': [game['homeTeam']['teamId'] for game in games],
+        'homeTeamName': [game['homeTeam']['teamName'] for game in games],
+        'homeTeamScore': [game['homeTeam']['score'] for game in games],
+        'awayTeamId': [game['awayTeam']['teamId'] for game in games],
+        'awayTeamName': [game['awayTeam']['teamName'] for game in games],
+        'awayTeamScore': [game['awayTeam']['score'] for game in games],
+    })
 
     # Add winning team column
-    df_filtered['winningTeam'] = df_filtered.apply(
-        lambda row: row['homeTeamName'] if row['homeTeamScore'] > row['awayTeamScore']
-        else (row['awayTeamName'] if row['awayTeamScore'] > row['homeTeamScore']
-            else 'Tie' if row['gameStatusText'] == 'Final' else 'Undefined'),
-        axis=1
+    home_score = df_filtered['homeTeamScore']
+    away_score = df_filtered['awayTeamScore']
+    df_filtered['winningTeam'] = np.select(
+        [home_score > away_score, away_score > home_score, df_filtered['gameStatusText'] == 'Final'],
+        [df_filtered['homeTeamName'], df_filtered['awayTeamName'], 'Tie'],
+        'Undefined'
     )
     
-    # Extract the date from gameEt and rename it gameDate
-    df_filtered['gameEt'] = pd.to_datetime(df_filtered['gameEt'])
-    df_filtered.rename(columns={'gameEt': 'gameDate'}, inplace=True)
-
     return df_filtered
 
-def get_past_games():
-    # Fetch the data
-    league_game_finder = leaguegamefinder.LeagueGameFinder(league_id_nullable='00', season_nullable='2024-25')
-    games = league_game_finder.get_data_frames()[0]
+def get_live_games():
+    return get_data_source().scoreboard()
+
+CURRENT_SEASON = games_dataset.current_season()
+GAME_TABLE_TTL = 3600  # seconds before a cached season game table is refetched
+MAX_CONCURRENT_REQUESTS = 5
 
+def normalize_game_finder(games):
     # Function to get the last word (nickname) of the team name
-    def get_team_nickname(full_name):
-        return full_name.split()[-1]
+    def get_team_nickname(names):
+        return names.str.split().str[-1]
 
     # Create separate dataframes for home and away teams
-    home_games = games[games['MATCHUP'].str.contains('vs.')].copy()
-    away_games = games[games['MATCHUP'].str.contains('@')].copy()
+    home_games = games[games['MATCHUP'].str.contains('vs.', regex=False)].copy()
+    away_games = games[games['MATCHUP'].str.contains('@', regex=False)].copy()
 
     # Rename columns and extract team nicknames
     home_games = home_games.rename(columns={
@@ -54,14 +61,14 @@ def get_past_games():
         'TEAM_NAME': 'homeTeamName',
         'PTS': 'homeTeamScore'
     })
-    home_games['homeTeamName'] = home_games['homeTeamName'].apply(get_team_nickname)
+    home_games['homeTeamName'] = get_team_nickname(home_games['homeTeamName'])
 
     away_games = away_games.rename(columns={
         'TEAM_ID': 'awayTeamId',
         'TEAM_NAME': 'awayTeamName',
         'PTS': 'awayTeamScore'
     })
-    away_games['awayTeamName'] = away_games['awayTeamName'].apply(get_team_nickname)
+    away_games['awayTeamName'] = get_team_nickname(away_games['awayTeamName'])
 
     # Merge home and away games on GAME_ID
     merged_games = pd.merge(
@@ -87,46 +94,325 @@ def get_past_games():
     final_df['gameStatusText'] = 'Final'  # Placeholder
 
     # Reorder columns
-    final_df = final_df[[
-        'gameId', 'gameStatusText', 'gameDate',
-        'homeTeamId', 'homeTeamName', 'homeTeamScore',
-        'awayTeamId', 'awayTeamName', 'awayTeamScore',
-        'winningTeam'
-    ]]
-
-    # Display the result
+    final_df = final_df[GAME_TABLE_COLUMNS]
+
     return final_df
 
+def fetch_past_games(season=CURRENT_SEASON):
+    # Fetch the data
+    from nba_api.stats.endpoints import leaguegamefinder
+    games = fetch_data(leaguegamefinder.LeagueGameFinder, league_id_nullable='00', season_nullable=season)
+    if games is None:
+        return pd.DataFrame(columns=GAME_TABLE_COLUMNS)
+    return normalize_game_finder(games)
+
+def load_season(season):
+    # Finished seasons never change, so they are read from the local dataset once stored
+    finished = games_dataset.is_finished(season)
+    if finished:
+        games = games_dataset.read_partition(season)
+        if games is not None:
+            return games
+    games = compact_game_table(fetch_past_games(season))
+    if finished and not games.empty:
+        games_dataset.write_partition(season, games)
+    return games
+
+def ingest_seasons(seasons, max_workers=MAX_CONCURRENT_REQUESTS):
+    # Download several seasons concurrently into the local dataset
+    seasons = list(seasons)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(seasons, (len(games) for games in executor.map(load_season, seasons))))
+
+class GameTable:
+    """Compact game table for one season, indexed by gameId and sorted by date."""
+
+    def __init__(self, df):
+        self.df = compact_game_table(df)
+        self.fetched_at = time.monotonic()
+        self.by_id = {game_id: i for i, game_id in enumerate(self.df['gameId'].tolist())}
+        self.dates = self.df['gameDate'].to_numpy()
+
+    def is_fresh(self, ttl=GAME_TABLE_TTL):
+        return time.monotonic() - self.fetched_at < ttl
+
+    def game(self, game_id):
+        i = self.by_id.get(int(game_id))
+        return self.df.iloc[[]] if i is None else self.df.iloc[[i]]
+
+    def games_on(self, day):
+        # Binary search for the day's rows in the sorted dates
+        day = np.datetime64(day, 'D')
+        start, end = self.dates.searchsorted([day, day + 1])
+        return self.df.iloc[start:end]
+
+_game_tables = {}
+_game_table_locks = {}
+_game_tables_lock = threading.Lock()
+
+def _is_current(table, season):
+    # A finished season is final once loaded, unless it came back empty (offline or failed fetch)
+    return table is not None and (table.is_fresh() or (games_dataset.is_finished(season) and not table.df.empty))
+
+def get_game_table(season=CURRENT_SEASON):
+    # Serve the shared table while it is fresh, otherwise refetch it once for all callers.
+    # Loads hold only their season's lock, so a slow fetch never blocks other seasons.
+    with _game_tables_lock:
+        table = _game_tables.get(season)
+        season_lock = _game_table_locks.setdefault(season, threading.Lock())
+    if _is_current(table, season):
+        metrics.count('nba_game_table_requests_total', result='hit')
+        return table
+    with season_lock:
+        with _game_tables_lock:
+            table = _game_tables.get(season)
+        # Loaded by another caller while this one waited
+        if _is_current(table, season):
+            metrics.count('nba_game_table_requests_total', result='hit')
+            return table
+        metrics.count('nba_game_table_requests_total', result='miss')
+        with metrics.timer('nba_game_table_load_seconds', season=season):
+            table = GameTable(load_season(season))
+        with _game_tables_lock:
+            _game_tables[season] = table
+        return table
+
+def invalidate_game_table(season=None):
+    with _game_tables_lock:
+        if season is None:
+            _game_tables.clear()
+        else:
+            _game_tables.pop(season, None)
+
+def get_past_games(season=CURRENT_SEASON):
+    return get_game_table(season).df
+
 def get_game_by_date(selected_date):
-    df = get_past_games()
-    # Filter for the selected date
-    final_df = df[df['gameDate'].str.startswith(selected_date.strftime('%Y-%m-%d'))]
-    return final_df
+    # Only the season containing the date is loaded
+    season = games_dataset.season_for_date(selected_date)
+    return expand_game_table(get_game_table(season).games_on(selected_date))
 
 def get_game_by_id(game_id):
-    df = get_past_games()
-    final_df = df[df['gameId'] == game_id]
-    return final_df
+    return expand_game_table(get_game_table().game(game_id))
 
 
+# Works on scalars as well as NumPy arrays and pandas Series
 def calculate_win_probability(elo_a, elo_b):
     return 1 / (1 + 10 ** ((elo_b - elo_a) / 400))
 
-def probability_to_odds(probability):
-    return 1 / probability
+# In-game model: the final margin is the current margin plus what is still to
+# come, which has the pregame expected margin scaled by the share of the game
+# left and a spread shrinking with its square root (a random walk over the game).
+REGULATION_SECONDS = 48 * 60
+PERIOD_SECONDS = 12 * 60
+MARGIN_SPREAD = 13.5  # standard deviation of an NBA game's final margin (points)
+MARGIN_SCALE = MARGIN_SPREAD * np.sqrt(3) / np.pi  # as the scale of a logistic distribution
+MIN_PROBABILITY = 0.01  # keeps in-play odds finite
+
+def seconds_remaining(status):
+    """
+    Regulation seconds left from gameStatusText ('Q3 5:32', 'Half', 'End Q2', 'OT 1:05', 'Final').
+    Overtime counts its own clock; games that have not started count the full 48 minutes.
+    """
+    status = pd.Series(status).astype(str).str.strip().reset_index(drop=True)
+    clock = status.str.extract(r'^(?:Q(?P<quarter>[1-4])|\d*OT\d*)\s+(?P<minutes>\d+):(?P<seconds>\d+(?:\.\d+)?)')
+    clock_seconds = clock['minutes'].astype(float) * 60 + clock['seconds'].astype(float)
+    quarter = clock['quarter'].astype(float)
+    ended = status.str.extract(r'^End\D*([1-4])', expand=False).astype(float)
+    return np.select(
+        [quarter.notna() & clock_seconds.notna(), clock_seconds.notna(), ended.notna(),
+         status.str.startswith(('End', 'Final')), status.str.startswith('Half')],
+        [(4 - quarter) * PERIOD_SECONDS + clock_seconds, clock_seconds, (4 - ended) * PERIOD_SECONDS,
+         0, 2 * PERIOD_SECONDS],
+        REGULATION_SECONDS,
+    ).astype(float)
+
+def live_win_probability(pregame_probability, margin, seconds_left):
+    """
+    Win probability during a game, for whole slates at once.
+
+    :param pregame_probability: Win probability before tip-off (e.g. from Elo)
+    :param margin: Current score margin of the same side
+    :param seconds_left: Regulation seconds left (see seconds_remaining)
+    """
+    share_left = np.clip(np.asarray(seconds_left, dtype=float) / REGULATION_SECONDS, 1 / REGULATION_SECONDS, 1)
+    pregame_probability = np.clip(pregame_probability, 1e-6, 1 - 1e-6)
+    # Pregame expected margin, from the logistic win probability at tip-off
+    expected_margin = MARGIN_SCALE * np.log(pregame_probability / (1 - pregame_probability))
+    z = (margin + expected_margin * share_left) / (MARGIN_SCALE * np.sqrt(share_left))
+    return 1 / (1 + np.exp(-z))
+
+def probability_to_odds(probability, margin=0.0):
+    # A bookmaker margin scales up every implied probability, e.g. 0.05 for a 5% overround
+    return 1 / (probability * (1 + margin))
+
+@metrics.timed('nba_transform_seconds', step='price_games')
+def price_games(games, ratings, margin=0.0, default_elo=1500):
+    """
+    Build the odds table for a slate of games in one columnar pass.
+
+    Games in progress are priced from their score and clock as well (see
+    live_win_probability); before tip-off that is the pregame Elo probability.
+
+    :param games: Game table (see get_live_games / get_past_games)
+    :param ratings: Mapping of team id to Elo rating
+    :param margin: Bookmaker margin applied to both sides
+    :return: DataFrame with one row per game, odds, logos and game links
+    """
+    import assets
+
+    home_elo = games['homeTeamId'].map(ratings).fillna(default_elo).to_numpy(dtype=float)
+    away_elo = games['awayTeamId'].map(ratings).fillna(default_elo).to_numpy(dtype=float)
+    score_margin = (pd.to_numeric(games['homeTeamScore']) - pd.to_numeric(games['awayTeamScore'])).fillna(0)
+
+    home_win_prob = live_win_probability(calculate_win_probability(home_elo, away_elo),
+                                         score_margin.to_numpy(dtype=float),
+                                         seconds_remaining(games['gameStatusText']))
+    home_win_prob = np.round(np.clip(home_win_prob, MIN_PROBABILITY, 1 - MIN_PROBABILITY), 2)
+    away_win_prob = np.round(1 - home_win_prob, 2)
+
+    home_team_id = games['homeTeamId'].astype(str)
+    away_team_id = games['awayTeamId'].astype(str)
+    return pd.DataFrame({
+        'Game ID': games['gameId'],
+        'Home Team': games['homeTeamName'],
+        'Away Team': games['awayTeamName'],
+        'Home Team ID': home_team_id,
+        'Away Team ID': away_team_id,
+        'Home Odds': probability_to_odds(home_win_prob, margin),
+        'Away Odds': probability_to_odds(away_win_prob, margin),
+        'Status': games['gameStatusText'],
+        'Home Logo': assets.logo_uris(home_team_id),
+        'Away Logo': assets.logo_uris(away_team_id),
+        'Game Link': "https://www.nba.com/game/" + games['gameId'].astype(str),
+    }).reset_index(drop=True)
+
+# Where nba_api responses come from, set with NBA_DATA_SOURCE:
+#   cached  on-disk cache while fresh, upstream otherwise (default)
+#   live    always upstream; responses are still written to the cache
+#   replay  only a local snapshot in the cache layout (NBA_REPLAY_DIR, default the
+#           cache itself), never upstream. NBA_OFFLINE=1 is a shorthand for it.
+# A snapshot is any cache directory, e.g. one filled by running the app with
+# NBA_CACHE_DIR=snapshots/demo.
+DATA_SOURCE = os.environ.get('NBA_DATA_SOURCE', 'replay' if os.environ.get('NBA_OFFLINE') == '1' else 'cached')
+REPLAY_DIR = os.environ.get('NBA_REPLAY_DIR')
+
+def _scoreboard_endpoint():
+    from nba_api.live.nba.endpoints import scoreboard
+    return scoreboard.ScoreBoard
+
+class LiveSource:
+    """Every request goes upstream, through the shared scheduler."""
+
+    def fetch(self, endpoint, kwargs, has_fallback=False):
+        # Identical requests already in flight (from any session) share one upstream call
+        key, _ = store.request_key(endpoint, kwargs)
+        return get_scheduler().run(key, partial(fetch_upstream, endpoint, kwargs, has_fallback))
+
+    def scoreboard(self):
+        endpoint = _scoreboard_endpoint()
+        with metrics.timer('nba_upstream_seconds', endpoint='ScoreBoard'):
+            games = parse_scoreboard(endpoint().games.get_dict())
+        # Kept in the cache too, so snapshots include the day's scoreboard
+        store.save(endpoint, {}, games)
+        return games
+
+class CachedSource(LiveSource):
+    """Fresh responses from the on-disk cache, the rest upstream (stale copies when upstream fails)."""
+
+    def fetch(self, endpoint, kwargs):
+        name = store.endpoint_name(endpoint)
+        with metrics.timer('nba_cache_read_seconds', endpoint=name):
+            cached, is_fresh = store.load(endpoint, kwargs)
+        if is_fresh:
+            metrics.count('nba_cache_requests_total', endpoint=name, result='hit')
+            return cached
+        metrics.count('nba_cache_requests_total', endpoint=name, result='miss' if cached is None else 'stale')
+
+        df = super().fetch(endpoint, kwargs, has_fallback=cached is not None)
+        if df is None and cached is not None:
+            print("Serving cached data.")
+            return cached
+        return df
+
+class ReplaySource:
+    """Responses from a local snapshot only, whatever their age; missing ones are None."""
+
+    def __init__(self, root=None):
+        self.root = root
+
+    def fetch(self, endpoint, kwargs):
+        name = store.endpoint_name(endpoint)
+        with metrics.timer('nba_cache_read_seconds', endpoint=name):
+            df, _ = store.load(endpoint, kwargs, root=self.root)
+        metrics.count('nba_cache_requests_total', endpoint=name, result='replay' if df is not None else 'replay_miss')
+        return df
+
+    def scoreboard(self):
+        games = self.fetch(_scoreboard_endpoint(), {})
+        return games if games is not None else pd.DataFrame(columns=GAME_TABLE_COLUMNS)
+
+DATA_SOURCES = {
+    'live': LiveSource,
+    'cached': CachedSource,
+    'replay': lambda: ReplaySource(REPLAY_DIR),
+}
+
+_data_source = None
+_data_source_lock = threading.Lock()
+
+def get_data_source():
+    global _data_source
+    with _data_source_lock:
+        if _data_source is None:
+            if DATA_SOURCE not in DATA_SOURCES:
+                raise ValueError(f"Unknown NBA_DATA_SOURCE {DATA_SOURCE!r}, expected one of {', '.join(DATA_SOURCES)}")
+            _data_source = DATA_SOURCES[DATA_SOURCE]()
+        return _data_source
+
+def set_data_source(source):
+    """Switch the process to another source instance, e.g. ReplaySource(path)."""
+    global _data_source
+    with _data_source_lock:
+        _data_source = source
+    invalidate_game_table()
+
 
 # @st.cache_data(ttl=3600)  # Cache data for 1 hour
 def fetch_data(endpoint, **kwargs):
-    max_retries = 5
+    return get_data_source().fetch(endpoint, kwargs)
+
+def fetch_upstream(endpoint, kwargs, has_fallback=False):
+    """
+    Fetch a response upstream with retries, None when that fails.
+
+    :param has_fallback: The caller has a stale copy to serve instead, so a single
+        failed attempt gives up rather than keeping the page waiting through the retries
+    """
+    scheduler = get_scheduler()
+    name = store.endpoint_name(endpoint)
+    max_retries = 1 if has_fallback else 5
     base_delay = 3  # seconds
     
     for i in range(max_retries):
         try:
             # Increase timeout to 60 seconds
             endpoint_with_timeout = partial(endpoint, timeout=60)
-            return endpoint_with_timeout(**kwargs).get_data_frames()[0]
+            with metrics.timer('nba_upstream_seconds', endpoint=name):
+                df = scheduler.attempt(lambda: endpoint_with_timeout(**kwargs).get_data_frames()[0])
+            with metrics.timer('nba_cache_write_seconds', endpoint=name):
+                store.save(endpoint, kwargs, df)
+            return df
+        except CircuitOpenError:
+            metrics.count('nba_upstream_failures_total', endpoint=name, reason='circuit_open')
+            print("Upstream is unavailable, not retrying until the circuit breaker resets.")
+            return None
         except (ReadTimeout, ConnectionError, TooManyRedirects) as e:
-            if i < max_retries - 1:
+            metrics.count('nba_upstream_failures_total', endpoint=name, reason=type(e).__name__)
+            if scheduler.breaker.state == 'open':
+                print("Upstream is unavailable, not retrying until the circuit breaker resets.")
+                return None
+            elif i < max_retries - 1:
                 delay = base_delay * (2 ** i)  # Exponential backoff
                 print(f"Request failed, retrying in {delay} seconds... (Attempt {i+1}/{max_retries})")
                 time.sleep(delay)
@@ -136,4 +422,42 @@ def fetch_data(endpoint, **kwargs):
 
 # @st.cache_data(ttl=86400)  # Cache player stats for 24 hours
 def fetch_player_stats(player_id):
+    from nba_api.stats.endpoints import playercareerstats
     return fetch_data(playercareerstats.PlayerCareerStats, player_id=player_id)
+
+# A fetch (cache or upstream) rather than a transformation; its upstream calls are timed by fetch_upstream too
+@metrics.timed('nba_fetch_seconds', endpoint='PlayerCareerStats', batch=True)
+def fetch_player_stats_batch(player_ids, max_workers=MAX_CONCURRENT_REQUESTS):
+    # Fetch career stats for several players at once, sharing the rate limiter
+    player_ids = list(player_ids)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(fetch_player_stats, player_ids)
+        return dict(zip(player_ids, results))
+
+@metrics.timed('nba_transform_seconds', step='roster')
+def roster_table(roster, player_stats):
+    """
+    Per-game averages of the roster's players in their latest season (Teams page).
+
+    :param roster: CommonTeamRoster frame
+    :param player_stats: Mapping of player id to PlayerCareerStats frame (see fetch_player_stats_batch)
+    :return: DataFrame with Name, Number, Position, Points, Assists and Rebounds, one row per player with stats
+    """
+    latest = {player_id: stats.iloc[-1] for player_id, stats in player_stats.items()
+              if stats is not None and not stats.empty}
+    roster = roster[roster['PLAYER_ID'].isin(list(latest))]
+    seasons = pd.DataFrame([latest[player_id] for player_id in roster['PLAYER_ID']], columns=['GP', 'PTS', 'AST', 'REB'])
+    games = seasons['GP'].to_numpy(dtype=float)
+    played = games > 0
+
+    def per_game(column):
+        return np.where(played, np.round(seasons[column].to_numpy(dtype=float) / np.where(played, games, 1), 1), 0)
+
+    return pd.DataFrame({
+        'Name': roster['PLAYER'].to_numpy(),
+        'Number': roster['NUM'].to_numpy(),
+        'Position': roster['POSITION'].to_numpy(),
+        'Points': per_game('PTS'),
+        'Assists': per_game('AST'),
+        'Rebounds': per_game('REB'),
+    })